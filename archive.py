@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Transcript Archive
+Append-only, compressed store for single-video transcriptions, replacing
+one small file per run with a few large shards.
+
+Each transcript is one JSON line compressed as its own frame (zstd when the
+optional zstandard package is installed, gzip otherwise) and appended to the
+current shard; concatenated frames are valid multi-frame zstd / multi-member
+gzip files, so `zstdcat` or `zcat` reads a shard as plain JSONL. A SQLite
+index maps each shortcode to the shard, offset and length of its newest
+record, so a lookup is one primary-key read, one seek and one frame
+decompression. Superseded records stay in the shards but are unreachable.
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+from url_utils import extract_shortcode
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    shortcode TEXT PRIMARY KEY,
+    url TEXT,
+    generated TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+"""
+
+DEFAULT_MAX_SHARD_BYTES = 256 * 1024 ** 2
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+SINGLE_SEPARATOR = '=' * 50
+TRANSCRIPTION_FILES = 'instagram_*_transcription_*.txt'
+
+
+def _zstd_compress(data):
+    return zstandard.ZstdCompressor(level=10).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _gzip_compress(data):
+    return gzip.compress(data, mtime=0)
+
+
+CODECS = {
+    'zst': (_zstd_compress, _zstd_decompress),
+    'gz': (_gzip_compress, gzip.decompress),
+}
+
+
+def default_codec():
+    return 'zst' if zstandard else 'gz'
+
+
+def read_transcription_file(path):
+    """Read a saved single-video transcription as (url, generated, text).
+
+    Returns None for files without a URL header (e.g. batch files).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if not content.startswith("Instagram Video Transcription"):
+        return None
+    header, _, body = content.partition(SINGLE_SEPARATOR)
+    url = re.search(r'^URL: (.*)$', header, re.MULTILINE)
+    if not url:
+        return None
+    generated = re.search(r'^Generated: (.*)$', header, re.MULTILINE)
+    if generated:
+        generated = generated.group(1).strip()
+    else:
+        generated = datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIMESTAMP_FORMAT)
+    return url.group(1).strip(), generated, body.strip()
+
+
+class TranscriptArchive:
+    """Sharded, compressed transcript archive keeping the newest record per shortcode."""
+
+    def __init__(self, archive_dir, max_shard_bytes=DEFAULT_MAX_SHARD_BYTES, codec=None):
+        codec = codec or default_codec()
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec '{codec}'. Use one of: {', '.join(CODECS)}")
+        if codec == 'zst' and not zstandard:
+            raise ValueError("zstd archives require: pip install zstandard")
+        # Resolved so locations match the normalised paths in the search index
+        self.archive_dir = Path(archive_dir).resolve()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.max_shard_bytes = max_shard_bytes
+        self.codec = codec
+        self.db_path = self.archive_dir / "index.db"
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    def location(self, shortcode):
+        """Stable reference to an archived transcript, used in place of a file path."""
+        return f"{self.archive_dir}#{shortcode}"
+
+    def shards(self):
+        return sorted(self.archive_dir.glob('transcripts-*.jsonl.*'))
+
+    def _next_shard(self, shard=None):
+        number = int(shard.name.split('-')[1].split('.')[0]) + 1 if shard else 1
+        return self.archive_dir / f"transcripts-{number:05d}.jsonl.{self.codec}"
+
+    def _writable_shard(self):
+        """Current shard if it uses this codec and has room, else a new one."""
+        shards = self.shards()
+        if not shards:
+            return self._next_shard()
+        last = shards[-1]
+        if last.suffix == f".{self.codec}" and last.stat().st_size < self.max_shard_bytes:
+            return last
+        return self._next_shard(last)
+
+    def append(self, url, transcription, generated=None, segments=None):
+        """Archive one transcript; returns its location, or None if a newer one is archived."""
+        record = {'url': url, 'transcription': transcription, 'generated': generated,
+                  'segments': segments}
+        stored = self.append_many([record])
+        return self.location(stored[0]) if stored else None
+
+    def append_many(self, records):
+        """Archive transcripts in one transaction; returns the shortcodes stored.
+
+        records are dicts with url, transcription and optionally generated
+        ('YYYY-MM-DD HH:MM:SS', default now) and segments. A record is skipped
+        when the archive already holds a newer transcript for its shortcode.
+        """
+        compress = CODECS[self.codec][0]
+        stored = []
+        with closing(self._connect()) as conn:
+            # Serialize appenders across processes before touching the shards
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                shard = self._writable_shard()
+                f = open(shard, 'ab')
+                try:
+                    for record in records:
+                        shortcode = extract_shortcode(record['url'])
+                        if not shortcode:
+                            print(f"Warning: No shortcode in {record['url']}, not archived")
+                            continue
+                        generated = record.get('generated') or datetime.now().strftime(TIMESTAMP_FORMAT)
+                        current = conn.execute("SELECT generated FROM records WHERE shortcode = ?",
+                                               (shortcode,)).fetchone()
+                        if current and current[0] > generated:
+                            continue
+
+                        line = json.dumps({
+                            'shortcode': shortcode,
+                            'url': record['url'],
+                            'generated': generated,
+                            'transcription': record['transcription'],
+                            'segments': record.get('segments'),
+                        }, ensure_ascii=False) + "\n"
+                        frame = compress(line.encode('utf-8'))
+
+                        if f.tell() and f.tell() + len(frame) > self.max_shard_bytes:
+                            f.flush()
+                            os.fsync(f.fileno())
+                            f.close()
+                            shard = self._next_shard(shard)
+                            f = open(shard, 'ab')
+
+                        offset = f.tell()
+                        f.write(frame)
+                        conn.execute(
+                            "INSERT OR REPLACE INTO records (shortcode, url, generated, shard, offset, length) "
+                            "VALUES (?, ?, ?, ?, ?, ?)",
+                            (shortcode, record['url'], generated, shard.name, offset, len(frame)),
+                        )
+                        stored.append(shortcode)
+                    # Frames must be on disk before the index points at them
+                    f.flush()
+                    os.fsync(f.fileno())
+                finally:
+                    f.close()
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return stored
+
+    def entry(self, shortcode):
+        """Index row (url, generated, shard, offset, length) for shortcode, or None."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT url, generated, shard, offset, length FROM records WHERE shortcode = ?",
+                (shortcode,),
+            ).fetchone()
+
+    def _read(self, shard, offset, length):
+        decompress = CODECS[shard.rsplit('.', 1)[1]][1]
+        with open(self.archive_dir / shard, 'rb') as f:
+            f.seek(offset)
+            return json.loads(decompress(f.read(length)).decode('utf-8'))
+
+    def get(self, shortcode):
+        """Newest archived record for shortcode as a dict, or None."""
+        row = self.entry(shortcode)
+        if not row:
+            return None
+        return self._read(*row[2:])
+
+    def __contains__(self, shortcode):
+        return self.entry(shortcode) is not None
+
+    def __len__(self):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def records(self):
+        """Yield the newest record for every shortcode, in shard order."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT shard, offset, length FROM records ORDER BY shard, offset"
+            ).fetchall()
+        for row in rows:
+            yield self._read(*row)
+
+    def export(self, path):
+        """Write the newest record per shortcode to a plain JSONL file; returns the count."""
+        count = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.records():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def compact(self, directory, remove=True, batch_size=1000, index=None):
+        """Fold single-video transcription files in directory into the archive.
+
+        Only the newest file per shortcode is archived (and only if it is
+        newer than the archived record); with remove, every folded file is
+        deleted afterwards, including superseded duplicates. Files that
+        cannot be parsed are left in place. Returns a dict of counts.
+
+        With a TranscriptIndex, documents for the removed files are dropped
+        and each newly archived transcript is indexed under its archive
+        location, so search only returns the newest copy of each reel.
+        """
+        newest = {}
+        paths = {}
+        stats = {'files': 0, 'archived': 0, 'superseded': 0, 'skipped': 0, 'removed': 0}
+        for path in Path(directory).glob(TRANSCRIPTION_FILES):
+            stats['files'] += 1
+            try:
+                parsed = read_transcription_file(path)
+            except Exception as e:
+                print(f"Warning: Could not read {path}: {e}")
+                parsed = None
+            shortcode = extract_shortcode(parsed[0]) if parsed else None
+            if not shortcode:
+                stats['skipped'] += 1
+                continue
+            paths.setdefault(shortcode, []).append(path)
+            if shortcode not in newest or parsed[1] >= newest[shortcode]['generated']:
+                newest[shortcode] = {'url': parsed[0], 'generated': parsed[1],
+                                     'transcription': parsed[2]}
+
+        records = list(newest.values())
+        stored = []
+        for start in range(0, len(records), batch_size):
+            stored += self.append_many(records[start:start + batch_size])
+        stats['archived'] = len(stored)
+        stats['superseded'] = stats['files'] - stats['skipped'] - stats['archived']
+
+        if not remove:
+            return stats
+        if index is not None:
+            removed_paths = [path for shortcode_paths in paths.values() for path in shortcode_paths]
+            removed_paths += [self.location(shortcode) for shortcode in stored]
+            index.replace_documents(removed_paths, [
+                (newest[shortcode]['url'], newest[shortcode]['transcription'],
+                 self.location(shortcode), None)
+                for shortcode in stored
+            ])
+        for shortcode_paths in paths.values():
+            for path in shortcode_paths:
+                os.remove(path)
+                stats['removed'] += 1
+        return stats
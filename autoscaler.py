@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Stage Autoscaler
+Pipelined batch transcription: download and decode run in thread pools
+that are resized at runtime, feeding the single inference loop.
+
+The autoscaler samples queue depths and per-stage throughput on a fixed
+interval. When inference is about to starve it adds workers to whichever
+stage is behind; when decoded audio piles up (or exceeds the memory budget)
+it removes download/decode workers, down to pausing a stage entirely. Every
+decision is logged and kept in StageAutoscaler.decisions for auditing.
+
+Between decisions, backpressure keeps the limits: a download reserves one
+of high_watermark slots for videos ahead of inference (downloading, decoding
+or decoded) before it starts, and a decode reserves room for its expected
+output in the audio budget. Slots are taken under the pipeline lock and
+given back when inference takes the video, so concurrent workers cannot
+overshoot. When inference runs dry, a paused stage is resumed at once
+instead of on the next autoscaler tick.
+"""
+
+import os
+import queue
+import threading
+import time
+
+
+DEFAULT_MAX_DOWNLOAD_WORKERS = 4
+DEFAULT_MAX_QUEUED_AUDIO_BYTES = 512 * 1024 ** 2
+
+
+def audio_nbytes(audio):
+    """Approximate memory held by decoded audio (AudioSegment or sample array)."""
+    if audio is None:
+        return 0
+    if hasattr(audio, 'nbytes'):
+        return audio.nbytes
+    return len(getattr(audio, 'raw_data', b''))
+
+
+class StagePool:
+    """A pool of daemon threads running fn over items from inbox.
+
+    resize() changes the target size at runtime; surplus workers retire
+    after finishing their current item, so no work is ever interrupted.
+    A target of 0 pauses the stage until it is resized again.
+    """
+
+    def __init__(self, name, fn, inbox, size=1):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.target = 0
+        self.live = 0
+        self.busy = 0
+        self.completed = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        self.resize(size)
+
+    def resize(self, target):
+        with self._lock:
+            self.target = max(0, target)
+            spawn = self.target - self.live
+            self.live += max(spawn, 0)
+        for _ in range(spawn):
+            threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True).start()
+
+    def _retire_if_surplus(self):
+        with self._lock:
+            if self.live > self.target or self.closed:
+                self.live -= 1
+                return True
+        return False
+
+    def _run(self):
+        while not self._retire_if_surplus():
+            try:
+                item = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self.busy += 1
+            try:
+                self.fn(item)
+            except Exception as e:
+                print(f"Error in {self.name} stage: {e}")
+            finally:
+                with self._lock:
+                    self.busy -= 1
+                    self.completed += 1
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+
+
+class StageAutoscaler:
+    """Resizes the download and decode pools to keep inference fed.
+
+    Limits: at most max_download_workers downloads (network-bound), at most
+    max_decode_workers decodes (CPU-bound; defaults to all cores but one,
+    which is left to inference) and at most max_queued_audio_bytes of decoded
+    audio waiting for inference. Downloads in flight count towards the
+    high_watermark videos allowed ahead of inference, so downloads are never
+    scaled past it.
+    """
+
+    def __init__(self, max_download_workers=DEFAULT_MAX_DOWNLOAD_WORKERS,
+                 max_decode_workers=None, max_queued_audio_bytes=DEFAULT_MAX_QUEUED_AUDIO_BYTES,
+                 interval=2.0, low_watermark=1, high_watermark=4):
+        self.max_download_workers = max(1, max_download_workers)
+        self.max_decode_workers = max(1, max_decode_workers or (os.cpu_count() or 2) - 1)
+        self.max_queued_audio_bytes = max_queued_audio_bytes
+        self.interval = interval
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.decisions = []
+        # Highest decoded-audio backlog seen by the last run_pipeline
+        self.peak_queued_audio_bytes = 0
+        self._last_completed = {}
+        self._started = None
+        # step() runs on the controller thread, resume_paused() on the inference thread
+        self._lock = threading.Lock()
+
+    def _rates(self, pools, inference_completed, elapsed):
+        counts = {name: pool.completed for name, pool in pools.items()}
+        counts['inference'] = inference_completed
+        rates = {
+            name: (count - self._last_completed.get(name, 0)) / elapsed if elapsed else 0.0
+            for name, count in counts.items()
+        }
+        self._last_completed = counts
+        return rates
+
+    def _resize(self, pool, target, reason, metrics):
+        decision = {
+            'time': round(time.monotonic() - self._started, 2),
+            'stage': pool.name,
+            'from': pool.target,
+            'to': target,
+            'reason': reason,
+            'metrics': metrics,
+        }
+        self.decisions.append(decision)
+        rates = "".join(f"; {name}={rate:.2f}/s" for name, rate in metrics['rates'].items())
+        print(f"[autoscaler] t={decision['time']:.1f}s {pool.name} workers "
+              f"{pool.target}->{target}: {reason} "
+              f"(download backlog={metrics['download_backlog']}, "
+              f"decode backlog={metrics['decode_backlog']}, ready={metrics['ready']}, "
+              f"queued audio={metrics['queued_audio_bytes'] / 1024 ** 2:.1f}MB{rates})")
+        pool.resize(target)
+
+    def _metrics(self, download, decode, ready, queued_audio_bytes, inference_busy, rates):
+        if self._started is None:
+            self._started = time.monotonic()
+        return {
+            'download_backlog': download.inbox.qsize(),
+            'decode_backlog': decode.inbox.qsize(),
+            'ready': ready,
+            'queued_audio_bytes': queued_audio_bytes,
+            'inference_busy': inference_busy,
+            'rates': rates,
+        }
+
+    def resume_paused(self, download, decode, ready, queued_audio_bytes):
+        """Restart a stage paused at 0 workers when inference has nothing left to do.
+
+        Called by the pipeline as soon as the ready queue drains, so an idle
+        model does not wait for the next step(). Returns True if a stage was resumed.
+        """
+        if ready or queued_audio_bytes > self.max_queued_audio_bytes:
+            return False
+        with self._lock:
+            for pool in (decode, download):
+                if pool.target == 0 and pool.inbox.qsize() > 0:
+                    metrics = self._metrics(download, decode, ready, queued_audio_bytes, False, {})
+                    self._resize(pool, 1, "inference idle, resuming paused stage", metrics)
+                    return True
+        return False
+
+    def step(self, download, decode, ready, queued_audio_bytes, inference_busy,
+             inference_completed, elapsed):
+        """Make at most one scaling decision from the current pipeline state."""
+        with self._lock:
+            self._step(download, decode, ready, queued_audio_bytes, inference_busy,
+                       inference_completed, elapsed)
+
+    def _step(self, download, decode, ready, queued_audio_bytes, inference_busy,
+              inference_completed, elapsed):
+        metrics = self._metrics(download, decode, ready, queued_audio_bytes, inference_busy,
+                                self._rates({'download': download, 'decode': decode},
+                                            inference_completed, elapsed))
+
+        if queued_audio_bytes > self.max_queued_audio_bytes:
+            if download.target > 0:
+                self._resize(download, download.target - 1, "decoded audio over memory budget", metrics)
+            elif decode.target > 0:
+                self._resize(decode, decode.target - 1, "decoded audio over memory budget", metrics)
+            return
+
+        if ready >= self.high_watermark:
+            # Inference is the bottleneck; stop fetching further ahead
+            if download.target > 0:
+                self._resize(download, download.target - 1, "decoded audio piling up", metrics)
+            elif decode.target > 0 and metrics['decode_backlog'] == 0:
+                self._resize(decode, decode.target - 1, "decoded audio piling up", metrics)
+            return
+
+        if ready < self.low_watermark:
+            # Inference is about to starve; grow the stage that is behind
+            if metrics['decode_backlog'] > 0 and decode.target < self.max_decode_workers:
+                self._resize(decode, decode.target + 1, "inference starving, decode backlog", metrics)
+            elif (metrics['download_backlog'] > 0
+                  and download.target < min(self.max_download_workers, self.high_watermark)):
+                self._resize(download, download.target + 1, "inference starving, downloads behind", metrics)
+
+
+def run_pipeline(transcriber, jobs, autoscaler):
+    """Transcribe (position, url) jobs with pipelined, autoscaled download/decode.
+
+    position is a unique key for the job; transcribe_selected_videos uses the
+    video's file index, so results, failure messages and profiler samples all
+    use the same video numbers. Duplicate positions raise ValueError.
+
+    Inference stays on the calling thread (one model instance). Returns a
+    dict mapping position to (transcription or None, segments or None,
+    (stage, reason) failure or None).
+    """
+    positions = [position for position, _ in jobs]
+    if len(set(positions)) != len(positions):
+        raise ValueError("run_pipeline job positions must be unique")
+
+    download_inbox = queue.Queue()
+    decode_inbox = queue.Queue()
+    ready = queue.Queue()
+    # ahead counts videos holding a download slot until inference takes them
+    state = {'queued_audio_bytes': 0, 'inference_busy': False, 'inference_completed': 0,
+             'ahead': 0, 'decoding': 0, 'decoded': 0, 'decoded_bytes': 0,
+             'peak_queued_audio_bytes': 0}
+    lock = threading.Lock()
+    # Notified whenever inference takes an item, so blocked workers re-check
+    room = threading.Condition(lock)
+    stop = threading.Event()
+
+    def reserve(has_room, counter):
+        """Wait for has_room(), then take a slot in state[counter] without releasing the lock."""
+        with room:
+            while not has_room() and not stop.is_set():
+                room.wait(0.1)
+            state[counter] += 1
+
+    def download_has_room():
+        # Do not fetch further ahead while enough videos are already on their way
+        return (state['ahead'] < autoscaler.high_watermark
+                and state['queued_audio_bytes'] < autoscaler.max_queued_audio_bytes)
+
+    def decode_has_room():
+        if state['queued_audio_bytes'] == 0 and state['decoding'] == 0:
+            # Always let one video through, however large, so the batch progresses
+            return True
+        if not state['decoded']:
+            return state['decoding'] == 0
+        expected = state['decoded_bytes'] / state['decoded']
+        return (state['queued_audio_bytes'] + (state['decoding'] + 1) * expected
+                <= autoscaler.max_queued_audio_bytes)
+
+    def hand_to_inference(position, url, audio, failure):
+        with lock:
+            state['queued_audio_bytes'] += audio_nbytes(audio)
+            state['peak_queued_audio_bytes'] = max(state['peak_queued_audio_bytes'],
+                                                   state['queued_audio_bytes'])
+        ready.put((position, url, audio, failure))
+
+    def download(job):
+        position, url = job
+        # The slot is given back when inference takes this video, whatever the outcome
+        reserve(download_has_room, 'ahead')
+        try:
+            with transcriber.profile_stage(video=position):
+                fetch(position, url)
+        except Exception as e:
+            hand_to_inference(position, url, None, ('download', str(e)))
+
+    def fetch(position, url):
+        transcriber.last_failure = None
+        if not transcriber.is_valid_instagram_url(url):
+            hand_to_inference(position, url, None, ('validate', "invalid Instagram URL"))
+            return
+        audio = transcriber.cached_audio(url)
+        if audio is not None:
+            hand_to_inference(position, url, audio, None)
+            return
+        video_path = transcriber.download_video(url)
+        if video_path:
+            decode_inbox.put((position, url, video_path))
+        else:
+            hand_to_inference(position, url, None, transcriber.last_failure)
+
+    def decode(job):
+        position, url, video_path = job
+        reserve(decode_has_room, 'decoding')
+        transcriber.last_failure = None
+        audio = None
+        failure = None
+        try:
+            with transcriber.profile_stage(video=position):
+                audio = transcriber.decode_audio(video_path, url)
+            if audio is None:
+                failure = transcriber.last_failure
+        except Exception as e:
+            failure = ('decode', str(e))
+        finally:
+            with lock:
+                state['decoding'] -= 1
+                if audio is not None:
+                    state['decoded'] += 1
+                    state['decoded_bytes'] += audio_nbytes(audio)
+        hand_to_inference(position, url, audio, failure)
+
+    for job in jobs:
+        download_inbox.put(job)
+    total = len(jobs)
+
+    download_pool = StagePool('download', download, download_inbox, size=1)
+    decode_pool = StagePool('decode', decode, decode_inbox, size=1)
+
+    def control_loop():
+        last = time.monotonic()
+        while not stop.wait(autoscaler.interval):
+            now = time.monotonic()
+            with lock:
+                queued = state['queued_audio_bytes']
+            autoscaler.step(download_pool, decode_pool, ready.qsize(), queued,
+                            state['inference_busy'], state['inference_completed'], now - last)
+            last = now
+
+    controller = threading.Thread(target=control_loop, name="autoscaler", daemon=True)
+    controller.start()
+
+    results = {}
+    try:
+        while len(results) < total:
+            try:
+                position, url, audio, failure = ready.get(timeout=0.1)
+            except queue.Empty:
+                # Inference is idle; do not leave a paused stage waiting for the next tick
+                with lock:
+                    queued = state['queued_audio_bytes']
+                autoscaler.resume_paused(download_pool, decode_pool, ready.qsize(), queued)
+                continue
+            with room:
+                state['queued_audio_bytes'] -= audio_nbytes(audio)
+                state['ahead'] -= 1
+                room.notify_all()
+            if audio is None:
+                results[position] = (None, None, failure or ('unknown', "no audio"))
+            else:
+                state['inference_busy'] = True
+                transcriber.last_failure = None
+                with transcriber.profile_stage(video=position):
+                    transcription = transcriber.transcribe_audio(audio)
+                state['inference_busy'] = False
+                if transcription:
+                    results[position] = (transcription, transcriber.last_segments, None)
+                else:
+                    results[position] = (None, None, transcriber.last_failure)
+            state['inference_completed'] += 1
+            print(f"Progress: {len(results)}/{total} - Finished: {url}")
+    finally:
+        stop.set()
+        autoscaler.peak_queued_audio_bytes = state['peak_queued_audio_bytes']
+        download_pool.close()
+        decode_pool.close()
+        controller.join()
+
+    return results
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Inference Backends
+Pluggable speech-to-text backends behind InstagramTranscriber.transcribe_audio.
+
+A backend is selected with a spec string "name[:model[:compute_type]]", e.g.
+"faster-whisper:small:int8", "distil-whisper:distil-large-v3" or
+"whisper-cpp:base".
+"""
+
+from abc import ABC, abstractmethod
+
+
+DEFAULT_BACKEND = "faster-whisper:small:int8"
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend's optional dependency is not installed."""
+
+
+class InferenceBackend(ABC):
+    """Base class for speech-to-text backends.
+
+    Subclasses implement load() and transcribe(); transcribe takes an audio
+    file path or a float32 array of 16 kHz mono samples and yields segment
+    dicts with start/end in seconds and text, lazily where the engine allows.
+    Backends restricted to some languages override check_language().
+    """
+
+    name = None
+    default_model = None
+
+    def __init__(self, model=None, compute_type=None):
+        self.model_name = model or self.default_model
+        self.compute_type = compute_type
+        self.model = None
+
+    @property
+    def spec(self):
+        parts = [self.name, self.model_name]
+        if self.compute_type:
+            parts.append(self.compute_type)
+        return ":".join(parts)
+
+    def check_language(self, language):
+        """Raise ValueError if this backend cannot transcribe language."""
+
+    @abstractmethod
+    def load(self):
+        """Load the model into self.model."""
+
+    @abstractmethod
+    def transcribe(self, audio, language="pt"):
+        """Yield segment dicts for audio."""
+
+
+class FasterWhisperBackend(InferenceBackend):
+    """faster-whisper (CTranslate2) at any model size and compute type."""
+
+    name = "faster-whisper"
+    default_model = "small"
+
+    def __init__(self, model=None, compute_type=None, device="cpu", beam_size=5):
+        super().__init__(model, compute_type or "int8")
+        self.device = device
+        self.beam_size = beam_size
+
+    def load(self):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(self.model_name, device=self.device,
+                                  compute_type=self.compute_type)
+
+    def transcribe_options(self):
+        return {'beam_size': self.beam_size, 'word_timestamps': True}
+
+    def transcribe(self, audio, language="pt"):
+        segments, info = self.model.transcribe(audio, language=language,
+                                               **self.transcribe_options())
+        for segment in segments:
+            yield {'start': segment.start, 'end': segment.end, 'text': segment.text}
+
+
+class DistilWhisperBackend(FasterWhisperBackend):
+    """Distil-Whisper checkpoints converted for CTranslate2.
+
+    The published distil-whisper checkpoints are English-only and are
+    refused for any other language; pass a Portuguese-distilled CTranslate2
+    checkpoint (hub id or local path) as the model to use this backend for
+    Portuguese content.
+    """
+
+    name = "distil-whisper"
+    default_model = "distil-large-v3"
+    english_only_models = {"distil-large-v2", "distil-large-v3", "distil-large-v3.5",
+                           "distil-medium.en", "distil-small.en"}
+
+    def check_language(self, language):
+        if language != "en" and self.model_name in self.english_only_models:
+            raise ValueError(
+                f"{self.model_name} is English-only; for '{language}' use "
+                f"distil-whisper:<multilingual CTranslate2 checkpoint> or another backend")
+
+    def transcribe_options(self):
+        # Distilled decoders are trained without previous-text conditioning
+        options = super().transcribe_options()
+        options['condition_on_previous_text'] = False
+        return options
+
+
+class WhisperCppBackend(InferenceBackend):
+    """whisper.cpp through the pywhispercpp binding, when it is installed."""
+
+    name = "whisper-cpp"
+    default_model = "small"
+
+    def __init__(self, model=None, compute_type=None, n_threads=None):
+        super().__init__(model, compute_type)
+        self.n_threads = n_threads
+
+    def load(self):
+        try:
+            from pywhispercpp.model import Model
+        except ImportError:
+            raise BackendUnavailable("whisper-cpp backend requires: pip install pywhispercpp")
+        options = {'print_progress': False, 'print_realtime': False}
+        if self.n_threads:
+            options['n_threads'] = self.n_threads
+        self.model = Model(self.model_name, **options)
+
+    def transcribe(self, audio, language="pt"):
+        # whisper.cpp reports segment times in 10 ms ticks
+        for segment in self.model.transcribe(audio, language=language):
+            yield {'start': segment.t0 / 100.0, 'end': segment.t1 / 100.0, 'text': segment.text}
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (FasterWhisperBackend, DistilWhisperBackend, WhisperCppBackend)
+}
+
+
+def create_backend(spec=None):
+    """Build an (unloaded) backend from a "name[:model[:compute_type]]" spec."""
+    name, _, rest = (spec or DEFAULT_BACKEND).partition(":")
+    model, _, compute_type = rest.partition(":")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name](model or None, compute_type or None)
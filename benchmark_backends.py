@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Backend Benchmark
+Runs every configured inference backend over a local fixture corpus and
+reports real-time factor, peak RSS, model load time, WER and similarity
+(1 - CER) against the expected transcripts, to pick the cheapest backend
+that meets the accuracy bar.
+
+Corpus layout: audio/video files in the corpus directory (e.g.
+tests/test_data/audio/sample_1.wav); the expected transcript for each file is
+<stem>.txt next to it or in tests/test_data/ (e.g. tests/test_data/sample_1.txt).
+The reels themselves are not committed: the default corpus is built on first
+run (or with --build-corpus) by downloading the reel named on the 'Video URL:'
+line of each tests/test_data/sample_*.txt and saving its audio as 16 kHz WAV.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from backends import BackendUnavailable, create_backend
+from evaluation import evaluate_pairs, read_transcript
+
+
+AUDIO_EXTENSIONS = ['.wav', '.mp3', '.m4a', '.mp4', '.webm', '.mkv', '.ogg', '.flac']
+TEST_DATA_DIR = Path(__file__).parent / "tests" / "test_data"
+DEFAULT_CORPUS_DIR = TEST_DATA_DIR / "audio"
+
+DEFAULT_BACKENDS = [
+    "faster-whisper:tiny:int8",
+    "faster-whisper:base:int8",
+    "faster-whisper:small:int8",
+    "faster-whisper:medium:int8",
+    "distil-whisper:distil-large-v3:int8",
+    "whisper-cpp:small",
+]
+
+
+def find_corpus(corpus_dir):
+    """Return (audio_path, expected_path) pairs for every file with an expected transcript."""
+    pairs = []
+    for audio_path in sorted(Path(corpus_dir).iterdir()):
+        if audio_path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        for expected in (audio_path.with_suffix('.txt'), TEST_DATA_DIR / f"{audio_path.stem}.txt"):
+            if expected.exists():
+                pairs.append((audio_path, expected))
+                break
+        else:
+            print(f"Warning: No expected transcript for {audio_path.name}, skipping")
+    return pairs
+
+
+def fixture_urls(test_data_dir=TEST_DATA_DIR):
+    """Return (stem, url) for every expected transcript that names its source reel."""
+    fixtures = []
+    for expected in sorted(Path(test_data_dir).glob('sample_*.txt')):
+        with open(expected, 'r', encoding='utf-8') as f:
+            match = re.match(r'Video URL: (\S+)', f.readline())
+        if match:
+            fixtures.append((expected.stem, match.group(1)))
+    return fixtures
+
+
+def build_corpus(corpus_dir, transcriber=None):
+    """Download the fixture reels into corpus_dir as 16 kHz mono WAV files.
+
+    Fixtures that already exist are kept. Returns the number of files written.
+    """
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    if transcriber is None:
+        from main import InstagramTranscriber
+        transcriber = InstagramTranscriber(output_dir=corpus_dir, load_model=False)
+
+    built = 0
+    for stem, url in fixture_urls():
+        target = corpus_dir / f"{stem}.wav"
+        if target.exists():
+            continue
+        print(f"Fetching fixture {stem}: {url}")
+        audio = transcriber.load_audio(url)
+        if audio is None:
+            print(f"Warning: Could not fetch {stem}, leaving it out of the corpus")
+            continue
+        audio.export(str(target), format="wav")
+        built += 1
+    return built
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_backend(spec, audio_paths, language):
+    """Load one backend and transcribe the corpus; runs in a fresh process."""
+    backend = create_backend(spec)
+    start = time.perf_counter()
+    try:
+        backend.check_language(language)
+        backend.load()
+    except (BackendUnavailable, ValueError) as e:
+        return {'backend': spec, 'error': str(e)}
+    load_seconds = time.perf_counter() - start
+
+    outputs = {}
+    transcribe_seconds = {}
+    for audio_path in audio_paths:
+        start = time.perf_counter()
+        segments = list(backend.transcribe(str(audio_path), language=language))
+        transcribe_seconds[str(audio_path)] = time.perf_counter() - start
+        outputs[str(audio_path)] = " ".join(segment['text'].strip() for segment in segments)
+
+    return {
+        'backend': spec,
+        'load_seconds': load_seconds,
+        'transcribe_seconds': transcribe_seconds,
+        'outputs': outputs,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def audio_duration(audio_path):
+    """Duration of an audio/video file in seconds."""
+    from pydub import AudioSegment
+    return AudioSegment.from_file(audio_path).duration_seconds
+
+
+def summarize(raw, durations, expected):
+    """Turn a run_backend result into one report row."""
+    if 'error' in raw:
+        return {'backend': raw['backend'], 'error': raw['error']}
+
+    total_audio = sum(durations.values())
+    total_compute = sum(raw['transcribe_seconds'].values())
+    samples, scores = evaluate_pairs(
+        (path, expected[path], output) for path, output in raw['outputs'].items()
+    )
+    similarities = [max(0.0, 1.0 - sample['cer']) * 100 for sample in samples]
+    return {
+        'backend': raw['backend'],
+        'load_seconds': round(raw['load_seconds'], 2),
+        'rtf': round(total_compute / total_audio, 3) if total_audio else None,
+        'peak_rss_mb': round(raw['peak_rss_mb'], 1),
+        'wer': round(scores['wer'] * 100, 1),
+        'similarity': round(sum(similarities) / len(similarities), 1) if similarities else None,
+        'min_similarity': round(min(similarities), 1) if similarities else None,
+    }
+
+
+def print_report(rows):
+    """Print the comparison table, cheapest real-time factor first."""
+    print(f"\n{'Backend':<40} {'Load s':>7} {'RTF':>7} {'RSS MB':>8} {'WER %':>7} "
+          f"{'Sim %':>7} {'Min %':>7}")
+    print("-" * 88)
+    ok = sorted((r for r in rows if 'error' not in r), key=lambda r: r['rtf'] or 0)
+    for row in ok:
+        print(f"{row['backend']:<40} {row['load_seconds']:>7.2f} {row['rtf']:>7.3f} "
+              f"{row['peak_rss_mb']:>8.1f} {row['wer']:>7.1f} {row['similarity']:>7.1f} "
+              f"{row['min_similarity']:>7.1f}")
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['backend']:<40} skipped: {row['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare inference backends on a local fixture corpus')
+    parser.add_argument('-c', '--corpus', default=str(DEFAULT_CORPUS_DIR),
+                        help='Directory of audio fixtures (default: tests/test_data/audio, '
+                             'built on first run)')
+    parser.add_argument('--build-corpus', action='store_true',
+                        help='Download any missing fixture reels into the corpus directory first')
+    parser.add_argument('-b', '--backend', action='append', dest='backends',
+                        help='Backend spec to benchmark; repeat for several (default: a standard set)')
+    parser.add_argument('-l', '--language', default='pt', help='Transcription language (default: pt)')
+    parser.add_argument('--min-similarity', type=float, default=90.0,
+                        help='Accuracy bar used to recommend a backend (default: %(default)s)')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    # The default corpus is not committed; fetch it the first time it is used
+    first_run = (Path(args.corpus).resolve() == DEFAULT_CORPUS_DIR.resolve()
+                 and not any(DEFAULT_CORPUS_DIR.glob('*.wav')))
+    if args.build_corpus or first_run:
+        print(f"Building fixture corpus in {args.corpus}...")
+        build_corpus(args.corpus)
+
+    if not os.path.isdir(args.corpus):
+        print(f"Error: Corpus directory not found: {args.corpus}")
+        sys.exit(1)
+
+    pairs = find_corpus(args.corpus)
+    if not pairs:
+        print("Error: No audio fixtures with expected transcripts found")
+        sys.exit(1)
+
+    audio_paths = [str(audio) for audio, _ in pairs]
+    expected = {str(audio): read_transcript(path) for audio, path in pairs}
+    durations = {path: audio_duration(path) for path in audio_paths}
+    print(f"Corpus: {len(pairs)} files, {sum(durations.values()):.1f}s of audio")
+
+    rows = []
+    # Each backend gets a fresh process so peak RSS and load time are its own
+    context = multiprocessing.get_context('spawn')
+    for spec in args.backends or DEFAULT_BACKENDS:
+        print(f"Benchmarking {spec}...")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                raw = executor.submit(run_backend, spec, audio_paths, args.language).result()
+            except Exception as e:
+                raw = {'backend': spec, 'error': str(e)}
+        rows.append(summarize(raw, durations, expected))
+
+    print_report(rows)
+
+    passing = [r for r in rows if 'error' not in r and r['similarity'] >= args.min_similarity]
+    if passing:
+        best = min(passing, key=lambda r: r['rtf'])
+        print(f"\nCheapest backend meeting {args.min_similarity:.0f}% similarity: {best['backend']}")
+    else:
+        print(f"\nNo backend reached {args.min_similarity:.0f}% similarity")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+        print(f"Report saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Creator Sync
+Incremental transcription of a creator's reels: only shortcodes that have
+not been transcribed in a previous run are processed, and their text is
+appended to a per-creator corpus file.
+"""
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+
+from url_utils import extract_shortcode
+
+
+class CreatorStateStore:
+    """Per-creator record of transcribed shortcodes and where their text lives.
+
+    Layout under the output directory:
+        creators/<username>/state.jsonl  one line per transcribed shortcode:
+                                         url, corpus, byte offset, time
+        creators/<username>/corpus.txt   appended transcriptions
+
+    Both files are append-only, so recording a reel costs one line however
+    large the catalogue already is.
+    """
+
+    def __init__(self, output_dir, username):
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', username.lstrip('@'))
+        if not safe_name:
+            raise ValueError("A creator username is required")
+        self.username = safe_name
+        self.creator_dir = Path(output_dir) / "creators" / safe_name
+        self.creator_dir.mkdir(parents=True, exist_ok=True)
+        self.state_path = self.creator_dir / "state.jsonl"
+        self.corpus_path = self.creator_dir / "corpus.txt"
+        self.items = self._load()
+
+    def _load(self):
+        items = {}
+        # State written by earlier versions as a single JSON document
+        legacy_path = self.creator_dir / "state.json"
+        if legacy_path.exists():
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                items.update(json.load(f).get('items', {}))
+        if not self.state_path.exists():
+            return items
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run interrupted mid-write leaves a partial last line;
+                    # that reel is simply transcribed again next sync
+                    continue
+                items[entry.pop('shortcode')] = entry
+        return items
+
+    def __contains__(self, shortcode):
+        return shortcode in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def new_items(self, urls):
+        """Return (shortcode, url) pairs from urls that are not in the store yet."""
+        pending = []
+        seen = set()
+        for url in urls:
+            shortcode = extract_shortcode(url)
+            if not shortcode or shortcode in self.items or shortcode in seen:
+                continue
+            seen.add(shortcode)
+            pending.append((shortcode, url))
+        return pending
+
+    def append(self, shortcode, url, transcription):
+        """Append a transcription to the corpus and record it in the state."""
+        entry = (
+            f"URL: {url}\n"
+            f"Transcribed: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"{'-'*60}\n"
+            f"{transcription.strip()}\n\n"
+        )
+        # Binary mode so tell() is a real byte offset into the corpus
+        with open(self.corpus_path, 'ab') as f:
+            offset = f.tell()
+            f.write(entry.encode('utf-8'))
+
+        item = {
+            'url': url,
+            'corpus': str(self.corpus_path),
+            'offset': offset,
+            'transcribed_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with open(self.state_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'shortcode': shortcode, **item}) + "\n")
+        self.items[shortcode] = item
+
+
+def sync_creator(transcriber, username, urls):
+    """Transcribe only the reels in urls that are new for this creator.
+
+    Returns a dict with counts of new, transcribed and failed videos plus
+    the corpus path. Failed videos are not recorded, so the next sync
+    retries them.
+    """
+    store = CreatorStateStore(transcriber.output_dir, username)
+    pending = store.new_items(urls)
+
+    print(f"Creator @{store.username}: {len(store)} reels already transcribed, "
+          f"{len(pending)} new of {len(urls)} in list")
+
+    transcribed = 0
+    for i, (shortcode, url) in enumerate(pending, 1):
+        print(f"\nSyncing new video {i}/{len(pending)}: {url}")
+        transcription = transcriber.transcribe_video_direct(url)
+        if transcription:
+            store.append(shortcode, url, transcription)
+            transcribed += 1
+            print(f"Video {shortcode} added to corpus")
+        else:
+            print(f"Failed to transcribe video {shortcode}; it will be retried next sync")
+
+    print(f"\nSync completed: {transcribed}/{len(pending)} new videos transcribed")
+    print(f"Corpus file: {store.corpus_path}")
+    return {
+        'new': len(pending),
+        'transcribed': transcribed,
+        'failed': len(pending) - transcribed,
+        'corpus': store.corpus_path,
+    }
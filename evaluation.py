@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Evaluation
+Word and character error rates (WER/CER) of transcripts against reference
+transcriptions, for scoring model or decoding changes offline over stored
+hypothesis/reference files.
+
+Edit distance uses the bit-parallel algorithm of Myers/Hyyrö: one row of
+the DP table is packed into a Python integer, so memory is linear in the
+reference length and each hypothesis token costs a handful of big-int
+operations instead of a Python-level loop over the whole row.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+SINGLE_SEPARATOR = '=' * 50
+
+# Below this many pairs, process start-up costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+
+def clean_text(text):
+    """Clean text for comparison by removing extra whitespace and normalizing."""
+    # Remove extra whitespace and normalize
+    text = re.sub(r'\s+', ' ', text.strip())
+    # Remove punctuation differences
+    text = re.sub(r'[.,!?;:]', '', text)
+    return text.lower()
+
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two sequences of hashable tokens."""
+    m = len(reference)
+    if m == 0:
+        return len(hypothesis)
+
+    # Bit i of peq[token] is set where reference[i] == token
+    peq = {}
+    for i, token in enumerate(reference):
+        peq[token] = peq.get(token, 0) | (1 << i)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = full
+    mv = 0
+    score = m
+    for token in hypothesis:
+        eq = peq.get(token, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh = mh << 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv & full
+    return score
+
+
+def word_error_rate(reference, hypothesis):
+    """WER of hypothesis text against reference text, after clean_text."""
+    ref_words = clean_text(reference).split()
+    hyp_words = clean_text(hypothesis).split()
+    if not ref_words:
+        return 0.0 if not hyp_words else 1.0
+    return edit_distance(ref_words, hyp_words) / len(ref_words)
+
+
+def character_error_rate(reference, hypothesis):
+    """CER of hypothesis text against reference text, after clean_text."""
+    ref_chars = clean_text(reference)
+    hyp_chars = clean_text(hypothesis)
+    if not ref_chars:
+        return 0.0 if not hyp_chars else 1.0
+    return edit_distance(ref_chars, hyp_chars) / len(ref_chars)
+
+
+def evaluate_pair(sample_id, reference, hypothesis):
+    """Score one hypothesis; returns a dict with error counts, WER and CER."""
+    ref_clean = clean_text(reference)
+    hyp_clean = clean_text(hypothesis)
+    ref_words = ref_clean.split()
+    hyp_words = hyp_clean.split()
+    word_errors = edit_distance(ref_words, hyp_words)
+    char_errors = edit_distance(ref_clean, hyp_clean)
+    return {
+        'id': sample_id,
+        'ref_words': len(ref_words),
+        'hyp_words': len(hyp_words),
+        'word_errors': word_errors,
+        'wer': word_errors / len(ref_words) if ref_words else float(bool(hyp_words)),
+        'ref_chars': len(ref_clean),
+        'char_errors': char_errors,
+        'cer': char_errors / len(ref_clean) if ref_clean else float(bool(hyp_clean)),
+    }
+
+
+def _evaluate_star(args):
+    return evaluate_pair(*args)
+
+
+def aggregate(samples):
+    """Corpus-level WER/CER (total errors over total reference length) plus means."""
+    ref_words = sum(s['ref_words'] for s in samples)
+    ref_chars = sum(s['ref_chars'] for s in samples)
+    count = len(samples)
+    return {
+        'samples': count,
+        'ref_words': ref_words,
+        'word_errors': sum(s['word_errors'] for s in samples),
+        'wer': sum(s['word_errors'] for s in samples) / ref_words if ref_words else 0.0,
+        'cer': sum(s['char_errors'] for s in samples) / ref_chars if ref_chars else 0.0,
+        'mean_wer': sum(s['wer'] for s in samples) / count if count else 0.0,
+        'mean_cer': sum(s['cer'] for s in samples) / count if count else 0.0,
+    }
+
+
+def evaluate_pairs(pairs, workers=None):
+    """Score (sample_id, reference, hypothesis) tuples, in parallel for large sets.
+
+    Returns (samples, aggregate) with samples in input order.
+    """
+    pairs = list(pairs)
+    if workers == 1 or len(pairs) < PARALLEL_THRESHOLD:
+        samples = [evaluate_pair(*pair) for pair in pairs]
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(pairs) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            samples = list(executor.map(_evaluate_star, pairs, chunksize=chunksize))
+    return samples, aggregate(samples)
+
+
+def read_transcript(path):
+    """Read transcript text from a reference or hypothesis file.
+
+    Saved transcriptions have a metadata header ending in a '=' rule, and
+    reference files in tests/test_data start with a 'Video URL:' line;
+    both are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if SINGLE_SEPARATOR in content:
+        content = content.split(SINGLE_SEPARATOR, 1)[1].lstrip('=')
+    elif content.startswith('Video URL:'):
+        content = content.split('\n', 1)[1] if '\n' in content else ''
+    return content.strip()
+
+
+def load_pairs(reference_dir, hypothesis_dir):
+    """Pair reference and hypothesis .txt files by file name stem."""
+    references = {path.stem: path for path in Path(reference_dir).glob('*.txt')}
+    pairs = []
+    for hypothesis in sorted(Path(hypothesis_dir).glob('*.txt')):
+        reference = references.get(hypothesis.stem)
+        if reference:
+            pairs.append((hypothesis.stem, read_transcript(reference), read_transcript(hypothesis)))
+    return pairs
+
+
+def print_report(samples, summary):
+    """Print per-sample scores followed by the aggregate."""
+    print(f"{'Sample':<40} {'Words':>7} {'WER %':>7} {'CER %':>7}")
+    print("-" * 64)
+    for sample in samples:
+        print(f"{sample['id']:<40} {sample['ref_words']:>7} "
+              f"{sample['wer'] * 100:>7.2f} {sample['cer'] * 100:>7.2f}")
+    print("-" * 64)
+    print(f"{'Corpus (' + str(summary['samples']) + ' samples)':<40} {summary['ref_words']:>7} "
+          f"{summary['wer'] * 100:>7.2f} {summary['cer'] * 100:>7.2f}")
+    print(f"Mean per-sample WER: {summary['mean_wer'] * 100:.2f}%  "
+          f"CER: {summary['mean_cer'] * 100:.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score transcripts against references (WER/CER)')
+    parser.add_argument('-r', '--references', required=True,
+                        help='Directory of reference transcripts (<id>.txt)')
+    parser.add_argument('-H', '--hypotheses', required=True,
+                        help='Directory of hypothesis transcripts with matching file names')
+    parser.add_argument('-w', '--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.references, args.hypotheses)
+    if not pairs:
+        print("Error: No hypothesis files with a matching reference found")
+        sys.exit(1)
+
+    samples, summary = evaluate_pairs(pairs, args.workers)
+    print_report(samples, summary)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'samples': samples, 'aggregate': summary}, f, indent=2)
+        print(f"Report saved to: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
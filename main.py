@@ -10,23 +10,85 @@ import sys
 from pathlib import Path
 from urllib.parse import urlparse
 import yt_dlp
-from faster_whisper import WhisperModel
+import numpy as np
 from pydub import AudioSegment
 import tempfile
+import shutil
 import re
 import time
+import asyncio
+import threading
+from contextlib import nullcontext
 from datetime import datetime
+from work_queue import WorkQueue, run_worker, merge_results
+from creator_sync import sync_creator
+from transcript_index import TranscriptIndex, format_ms
+from url_utils import extract_shortcode
+from media_cache import DEFAULT_MAX_BYTES, DTYPES, SAMPLE_RATE, MediaCache, to_float32
+from autoscaler import DEFAULT_MAX_DOWNLOAD_WORKERS, DEFAULT_MAX_QUEUED_AUDIO_BYTES, StageAutoscaler, run_pipeline
+from profiler import DEFAULT_INTERVAL, SamplingProfiler
+from archive import TranscriptArchive
+from backends import DEFAULT_BACKEND, BackendUnavailable, InferenceBackend, create_backend
+from resilience import (DEFAULT_TIMEOUTS, CircuitBreaker, RetryPolicy, StageTimeout,
+                        format_failure, is_permanent_error, is_rate_limited, run_process,
+                        run_with_timeout)
+
+# Reels are transcribed as Portuguese
+LANGUAGE = "pt"
 
 
 class InstagramTranscriber:
-    def __init__(self, output_dir="transcriptions"):
-        """Initialize the transcriber with output directory."""
+    def __init__(self, output_dir="transcriptions", load_model=True, index_path=None,
+                 timeouts=None, retry_policy=None, backend=None, media_cache=None, profiler=None,
+                 archive=None):
+        """Initialize the transcriber with output directory and optional search index.
+        
+        timeouts maps stage name (download, decode, transcribe) to seconds and
+        overrides DEFAULT_TIMEOUTS; retry_policy controls download retries.
+        backend is an InferenceBackend or a spec such as "faster-whisper:small:int8".
+        media_cache, if given, is a MediaCache that decoded audio is reused from.
+        profiler, if given, is a SamplingProfiler whose samples are tagged by stage.
+        archive, if given, is a TranscriptArchive that single-video transcriptions
+        are written to instead of individual files.
+        """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
-        # Initialize Whisper model (using small model for better accuracy)
-        print("Loading Whisper model...")
-        self.model = WhisperModel("small", device="cpu", compute_type="int8")
+        # Saved transcripts are added to the full-text index when one is configured
+        self.index = TranscriptIndex(index_path) if index_path else None
+        self.last_segments = []
+        # Timings of the most recent transcription (time_to_first_text, total)
+        self.last_metrics = {}
+        
+        # Per-stage deadlines, download retries and rate-limit circuit breaker
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+        # (stage, reason) of the most recent failure, and per-URL batch failures
+        self._thread_state = threading.local()
+        self.last_failure = None
+        self.failures = {}
+        
+        # Decoded audio is reused across runs when a media cache is configured
+        self.media_cache = media_cache
+        
+        # Samples are tagged with the stage and video being processed
+        self.profiler = profiler
+        
+        # Single-video transcriptions go into the archive instead of new files
+        self.archive = archive
+        
+        # Coordinator and merge steps never transcribe, so they skip the model
+        if not isinstance(backend, InferenceBackend):
+            backend = create_backend(backend)
+        backend.check_language(LANGUAGE)
+        self.backend = backend
+        if not load_model or backend.model is not None:
+            return
+        
+        # Initialize Whisper model (faster-whisper small by default for better accuracy)
+        print(f"Loading Whisper model ({backend.spec})...")
+        backend.load()
         print("Whisper model loaded successfully!")
     
     def is_valid_instagram_url(self, url):
@@ -34,107 +96,326 @@ class InstagramTranscriber:
         parsed = urlparse(url)
         return parsed.netloc in ['www.instagram.com', 'instagram.com'] and ('/p/' in url or '/reel/' in url)
     
-    def download_video(self, url):
-        """Download Instagram video using yt-dlp."""
-        print(f"Downloading video from: {url}")
+    @property
+    def last_failure(self):
+        """(stage, reason) of the most recent failure in the calling thread."""
+        return getattr(self._thread_state, 'last_failure', None)
+    
+    @last_failure.setter
+    def last_failure(self, value):
+        # Thread-local so pipelined download/decode stages don't overwrite each other
+        self._thread_state.last_failure = value
+    
+    def profile_stage(self, stage=None, video=None):
+        """Tag profiler samples of the calling thread (no-op without a profiler)."""
+        if not self.profiler:
+            return nullcontext()
+        return self.profiler.stage(stage, video)
+    
+    def _profiled(self, stage, fn):
+        """Wrap fn so it is profiled under stage even when run in a worker thread."""
+        if not self.profiler:
+            return fn
+        with self.profile_stage(stage):
+            return self.profiler.bind(fn)
+    
+    def _record_failure(self, stage, reason):
+        """Remember why the current video failed so batch output can report it."""
+        self.last_failure = (stage, str(reason))
+    
+    def _download_once(self, url, cancelled=None):
+        """Single yt-dlp download attempt; raises on failure.
         
+        cancelled is an Event set by the caller when it gives up on this
+        attempt (timeout); the download then aborts at its next progress
+        update instead of running on next to the retry. The attempt's
+        temporary directory is removed whenever no video is returned.
+        """
         # Create temporary directory for download
         temp_dir = tempfile.mkdtemp()
+        
+        def abort_if_cancelled(progress):
+            if cancelled is not None and cancelled.is_set():
+                raise RuntimeError("download abandoned after timeout")
+        
         ydl_opts = {
             'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
             'format': 'best',
             'quiet': True,
             'no_warnings': True,
+            # Stop waiting on a stalled connection well before the stage deadline
+            'socket_timeout': 30,
+            'progress_hooks': [abort_if_cancelled],
         }
         
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=True)
                 
+                abort_if_cancelled(None)
                 # Find the downloaded file
                 for file_path in Path(temp_dir).glob('*'):
                     if file_path.suffix.lower() in ['.mp4', '.webm', '.mkv', '.m4a', '.mp3']:
                         return str(file_path)
+            
+            raise FileNotFoundError("Could not find downloaded video file")
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+    
+    def download_video(self, url):
+        """Download Instagram video using yt-dlp.
+        
+        Each attempt runs under the download deadline; timeouts and transient
+        errors are retried with backoff, and rate-limit errors also feed the
+        circuit breaker that pauses further downloads.
+        """
+        with self.profile_stage('download'):
+            print(f"Downloading video from: {url}")
+            
+            policy = self.retry_policy
+            for attempt in range(1, policy.max_attempts + 1):
+                self.circuit_breaker.wait_if_open()
+                cancelled = threading.Event()
+                try:
+                    video_path = run_with_timeout('download', self.timeouts['download'],
+                                                  self._profiled('download', self._download_once),
+                                                  url, cancelled)
+                    self.circuit_breaker.record_success()
+                    return video_path
+                except StageTimeout as e:
+                    # Stop the abandoned attempt so it does not race the retry
+                    cancelled.set()
+                    reason = str(e)
+                except Exception as e:
+                    reason = str(e)
+                    if is_rate_limited(reason):
+                        reason = f"rate limited ({reason})"
+                        self.circuit_breaker.record_rate_limit()
+                    elif is_permanent_error(reason):
+                        print(f"Error downloading video: {reason}")
+                        self._record_failure('download', reason)
+                        return None
                 
-                print("Error: Could not find downloaded video file")
-                return None
-                
-        except Exception as e:
-            print(f"Error downloading video: {e}")
+                print(f"Error downloading video (attempt {attempt}/{policy.max_attempts}): {reason}")
+                if attempt < policy.max_attempts:
+                    delay = policy.delay(attempt)
+                    print(f"Retrying download in {delay:.1f}s...")
+                    time.sleep(delay)
+            
+            self._record_failure('download', f"{reason} after {policy.max_attempts} attempts")
             return None
     
     def extract_audio(self, video_path):
-        """Extract audio from video file."""
+        """Extract audio from video file.
+        
+        ffmpeg decodes straight to 16 kHz mono (what inference consumes) and
+        is killed if it runs past the decode deadline.
+        """
         print("Extracting audio from video...")
         try:
-            # Load audio directly from video file
-            audio = AudioSegment.from_file(video_path)
+            pcm = run_process('decode', self.timeouts['decode'], [
+                AudioSegment.converter, '-nostdin', '-v', 'error', '-i', str(video_path),
+                '-vn', '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-',
+            ])
+            audio = AudioSegment(data=pcm, sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
             return audio
         except Exception as e:
             print(f"Error extracting audio: {e}")
+            self._record_failure('decode', e)
+            return None
+    
+    def cached_audio(self, url):
+        """Return the video's cached 16 kHz samples, or None on a miss or without a cache."""
+        shortcode = extract_shortcode(url)
+        if not self.media_cache or not shortcode:
+            return None
+        samples = self.media_cache.get(shortcode)
+        if samples is not None:
+            print(f"Using cached audio for: {shortcode}")
+        return samples
+    
+    def decode_audio(self, video_path, url):
+        """Extract audio from a downloaded video, remove the video and cache the samples."""
+        with self.profile_stage('decode'):
+            # Extract audio
+            audio = self.extract_audio(video_path)
+            
+            # Clean up temporary files
+            try:
+                os.remove(video_path)
+                os.rmdir(os.path.dirname(video_path))
+            except:
+                pass
+            
+            if audio is None:
+                return None
+            if len(audio) == 0:
+                self._record_failure('decode', "empty audio track")
+                return None
+            
+            shortcode = extract_shortcode(url)
+            if self.media_cache and shortcode:
+                try:
+                    return self.media_cache.put(shortcode, audio)
+                except Exception as e:
+                    print(f"Warning: Could not cache audio for {shortcode}: {e}")
+            return audio
+    
+    def load_audio(self, url):
+        """Download and decode a video's audio, or reuse it from the media cache.
+        
+        Returns 16 kHz mono samples (memory-mapped) when a media cache is
+        configured, otherwise the decoded AudioSegment; None on failure.
+        """
+        audio = self.cached_audio(url)
+        if audio is not None:
+            return audio
+        
+        # Download video
+        video_path = self.download_video(url)
+        if not video_path:
             return None
+        
+        return self.decode_audio(video_path, url)
+    
+    def iter_segments(self, audio, started=None):
+        """Yield transcript segments as soon as the backend decodes them.
+        
+        audio is a pydub AudioSegment or an array of 16 kHz mono samples.
+        Each segment is a dict with start/end in seconds and text. Segments
+        are decoded lazily, so the transcribe deadline is checked between
+        segments and a pathological clip is abandoned part-way (StageTimeout).
+        Time to first text is measured from started (default: now) and
+        stored in self.last_metrics.
+        """
+        started = started or time.monotonic()
+        self.last_segments = []
+        self.last_metrics = {}
+        temp_path = None
+        try:
+            with self.profile_stage('decode'):
+                if isinstance(audio, np.ndarray):
+                    # Cached PCM is already 16 kHz mono; skip the WAV round-trip
+                    audio_input = to_float32(audio)
+                else:
+                    # Export audio to temporary WAV file for Whisper
+                    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
+                        temp_path = temp_audio.name
+                        audio.export(temp_audio.name, format="wav")
+                    audio_input = temp_path
+            
+            timeout = self.timeouts['transcribe']
+            deadline = time.monotonic() + timeout if timeout else None
+            
+            # Transcribe using the configured backend; only the backend's own
+            # work is profiled as "transcribe", not the consumer between yields
+            segments = self.backend.transcribe(audio_input, language=LANGUAGE)
+            while True:
+                with self.profile_stage('transcribe'):
+                    segment = next(segments, None)
+                if segment is None:
+                    break
+                # Keep segment timings for the transcript index
+                self.last_segments.append(segment)
+                if 'time_to_first_text' not in self.last_metrics:
+                    self.last_metrics['time_to_first_text'] = time.monotonic() - started
+                yield segment
+                if deadline and time.monotonic() > deadline:
+                    raise StageTimeout('transcribe', timeout)
+            
+            self.last_metrics['total'] = time.monotonic() - started
+        finally:
+            # Clean up temporary file
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
     
     def transcribe_audio(self, audio):
         """Transcribe audio using Whisper."""
         print("Transcribing audio...")
         try:
-            # Export audio to temporary WAV file for Whisper
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_audio:
-                audio.export(temp_audio.name, format="wav")
-                
-                # Transcribe using Whisper
-                segments, info = self.model.transcribe(
-                    temp_audio.name,
-                    language="pt",
-                    beam_size=5,
-                    word_timestamps=True
-                )
-                
-                # Clean up temporary file
-                os.unlink(temp_audio.name)
-                
-                # Combine all segments into one transcription
-                transcription = " ".join([segment.text for segment in segments])
-                return transcription.strip()
-                
+            for segment in self.iter_segments(audio):
+                pass
+            
+            # Combine all segments into one transcription
+            transcription = " ".join([segment['text'] for segment in self.last_segments])
+            if not transcription.strip():
+                self._record_failure('transcribe', "no speech detected")
+            return transcription.strip()
+            
         except Exception as e:
             print(f"Error transcribing audio: {e}")
+            self._record_failure('transcribe', e)
             return None
     
-    def save_transcription(self, transcription, url):
-        """Save transcription to file."""
+    def _transcription_path(self, url):
+        """Output path for a single-video transcription."""
         # Extract post ID from URL
         post_id_match = re.search(r'/reel/([^/?]+)', url)
         post_id = post_id_match.group(1) if post_id_match else "unknown"
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"instagram_{post_id}_transcription_{timestamp}.txt"
-        filepath = self.output_dir / filename
+        return self.output_dir / filename
+    
+    def _write_transcription_header(self, f, url):
+        f.write(f"Instagram Video Transcription\n")
+        f.write(f"URL: {url}\n")
+        f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"{'='*50}\n\n")
+    
+    def _archives(self, url):
+        """Whether url's transcription goes into the archive (it is keyed by shortcode)."""
+        if self.archive is None:
+            return False
+        if extract_shortcode(url):
+            return True
+        print(f"No shortcode in {url}; saving to a file instead of the archive")
+        return False
+    
+    def save_transcription(self, transcription, url, segments=None):
+        """Save transcription to file (or the archive) and add it to the index."""
+        if self._archives(url):
+            return self.archive_transcription(transcription, url, segments)
+        
+        filepath = self._transcription_path(url)
         
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"Instagram Video Transcription\n")
-            f.write(f"URL: {url}\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"{'='*50}\n\n")
+            self._write_transcription_header(f, url)
             f.write(transcription)
         
         print(f"Transcription saved to: {filepath}")
+        
+        if self.index:
+            self.index.add_transcript(url, transcription, filepath, segments)
         return filepath
     
+    def archive_transcription(self, transcription, url, segments=None):
+        """Append transcription to the archive and add it to the index.
+        
+        url must contain a shortcode; see _archives().
+        """
+        location = self.archive.append(url, transcription, segments=segments)
+        if not location:
+            # Only possible with a clock that went backwards; keep the newer record
+            print(f"A newer transcription of {url} is already archived")
+            return self.archive.location(extract_shortcode(url))
+        print(f"Transcription archived to: {location}")
+        
+        if self.index:
+            # Replace the reel's previous archived copy in search results
+            self.index.replace_documents([location], [(url, transcription, location, segments)])
+        return location
+    
     def transcribe_video(self, url):
         """Main method to transcribe a single video."""
         if not self.is_valid_instagram_url(url):
             print("Error: Please provide a valid Instagram post URL")
             return False
         
-        # Download video
-        video_path = self.download_video(url)
-        if not video_path:
-            return False
-        
-        # Extract audio
-        audio = self.extract_audio(video_path)
-        if not audio:
+        # Download video and extract audio (or reuse cached audio)
+        audio = self.load_audio(url)
+        if audio is None:
             return False
         
         # Transcribe audio
@@ -143,23 +424,129 @@ class InstagramTranscriber:
             return False
         
         # Save transcription
-        output_file = self.save_transcription(transcription, url)
+        output_file = self.save_transcription(transcription, url, self.last_segments)
         return output_file
     
-    def transcribe_video_direct(self, url):
-        """Transcribe a video and return the text directly without saving individual file."""
+    def stream_video(self, url):
+        """Yield segments of a video's transcription as they are decoded.
+        
+        Library API for callers that show partial results. Raises ValueError
+        for invalid URLs and RuntimeError when the audio cannot be loaded.
+        """
+        started = time.monotonic()
+        if not self.is_valid_instagram_url(url):
+            raise ValueError(f"Not a valid Instagram post URL: {url}")
+        
+        self.last_failure = None
+        audio = self.load_audio(url)
+        if audio is None:
+            raise RuntimeError(format_failure(self.last_failure))
+        
+        yield from self.iter_segments(audio, started=started)
+    
+    async def astream_video(self, url):
+        """Async iterator over stream_video, running inference in a worker thread."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+        stopped = threading.Event()
+        
+        def emit(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # The consumer's event loop has already closed
+                stopped.set()
+        
+        def produce():
+            try:
+                for segment in self.stream_video(url):
+                    if stopped.is_set():
+                        return
+                    emit(segment)
+            except Exception as e:
+                emit(e)
+            emit(done)
+        
+        threading.Thread(target=produce, name="stream-video", daemon=True).start()
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop decoding once the consumer goes away
+            stopped.set()
+    
+    def transcribe_video_streaming(self, url):
+        """Transcribe a single video, printing and writing each segment as soon as it is decoded."""
         if not self.is_valid_instagram_url(url):
             print("Error: Please provide a valid Instagram post URL")
-            return None
+            return False
         
-        # Download video
-        video_path = self.download_video(url)
-        if not video_path:
+        filepath = self._transcription_path(url)
+        written = []
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                self._write_transcription_header(f, url)
+                for segment in self.stream_video(url):
+                    if not written:
+                        print(f"Time to first text: {self.last_metrics['time_to_first_text']:.2f}s")
+                    print(f"[{segment['start']:7.2f}s -> {segment['end']:7.2f}s] {segment['text'].strip()}")
+                    f.write(segment['text'] if written else segment['text'].lstrip())
+                    f.flush()
+                    written.append(segment['text'])
+        except Exception as e:
+            print(f"Error transcribing video: {e}")
+            if written:
+                print(f"Partial transcription kept in: {filepath}")
+            else:
+                os.remove(filepath)
+            return False
+        
+        if not written:
+            print("Error transcribing audio: no speech detected")
+            os.remove(filepath)
+            return False
+        
+        print(f"Time to first text: {self.last_metrics['time_to_first_text']:.2f}s, "
+              f"total: {self.last_metrics['total']:.2f}s")
+        
+        if self._archives(url):
+            # The file only served live output; the finished transcript is archived
+            location = self.archive_transcription(" ".join(written).strip(), url, self.last_segments)
+            os.remove(filepath)
+            return location
+        
+        print(f"Transcription saved to: {filepath}")
+        
+        if self.index:
+            self.index.add_transcript(url, " ".join(written).strip(), filepath, self.last_segments)
+        return filepath
+    
+    def transcribe_video_direct(self, url):
+        """Transcribe a video and return the text directly without saving individual file.
+        
+        On failure returns None and records the reason in self.failures[url].
+        """
+        self.last_failure = None
+        self.failures.pop(url, None)
+        transcription = self._transcribe_video_direct(url)
+        if not transcription:
+            self.failures[url] = self.last_failure or ('validate', "invalid Instagram URL")
+        return transcription
+    
+    def _transcribe_video_direct(self, url):
+        if not self.is_valid_instagram_url(url):
+            print("Error: Please provide a valid Instagram post URL")
             return None
         
-        # Extract audio
-        audio = self.extract_audio(video_path)
-        if not audio:
+        # Download video and extract audio (or reuse cached audio)
+        audio = self.load_audio(url)
+        if audio is None:
             return None
         
         # Transcribe audio
@@ -167,12 +554,6 @@ class InstagramTranscriber:
         if not transcription:
             return None
         
-        # Clean up temporary files
-        try:
-            os.remove(video_path)
-        except:
-            pass
-        
         return transcription
     
     def parse_selection(self, selection_str, total_videos):
@@ -252,8 +633,13 @@ class InstagramTranscriber:
             print(f"Error loading URLs from file: {e}")
             return []
     
-    def transcribe_selected_videos(self, urls, selected_indices):
-        """Transcribe selected videos from the URLs list."""
+    def transcribe_selected_videos(self, urls, selected_indices, autoscaler=None):
+        """Transcribe selected videos from the URLs list.
+        
+        With a StageAutoscaler, downloads and decodes run ahead of inference
+        in worker pools that are resized at runtime; otherwise videos are
+        processed one after another.
+        """
         if not urls:
             print("No URLs provided for batch processing")
             return False
@@ -272,34 +658,74 @@ class InstagramTranscriber:
         # Transcribe selected videos
         print(f"\nStarting transcription of {selected_count} videos...")
         transcriptions = []
+        selected_urls = []
+        segments = []
+        failures = []
         
-        for i, video_index in enumerate(selected_indices, 1):
-            print(f"\nProcessing video {i}/{selected_count} (File index: {video_index})")
-            if progress_callback:
-                progress_callback(i, selected_count, urls[video_index - 1])
-            
-            # Transcribe video directly without saving individual file
-            transcription_text = self.transcribe_video_direct(urls[video_index - 1])
-            if transcription_text:
-                transcriptions.append(transcription_text)
-                print(f"Video {i} transcribed successfully")
-            else:
-                print(f"Failed to transcribe video {i}")
-                transcriptions.append("")  # Add empty string for failed transcriptions
+        if autoscaler:
+            jobs = [(video_index, urls[video_index - 1]) for video_index in selected_indices]
+            results = run_pipeline(self, jobs, autoscaler)
+            for i, (video_index, url) in enumerate(jobs, 1):
+                transcription_text, video_segments, failure = results[video_index]
+                selected_urls.append(url)
+                transcriptions.append(transcription_text or "")
+                segments.append(video_segments)
+                if transcription_text:
+                    failures.append(None)
+                else:
+                    self.failures[url] = failure
+                    failures.append(format_failure(failure))
+                    print(f"Failed to transcribe video {i} ({failures[-1]})")
+        else:
+            for i, video_index in enumerate(selected_indices, 1):
+                print(f"\nProcessing video {i}/{selected_count} (File index: {video_index})")
+                if progress_callback:
+                    progress_callback(i, selected_count, urls[video_index - 1])
+                
+                # Transcribe video directly without saving individual file
+                with self.profile_stage(video=video_index):
+                    transcription_text = self.transcribe_video_direct(urls[video_index - 1])
+                selected_urls.append(urls[video_index - 1])
+                if transcription_text:
+                    transcriptions.append(transcription_text)
+                    segments.append(self.last_segments)
+                    failures.append(None)
+                    print(f"Video {i} transcribed successfully")
+                else:
+                    failure = format_failure(self.failures.get(urls[video_index - 1]))
+                    print(f"Failed to transcribe video {i} ({failure})")
+                    transcriptions.append("")  # Add empty string for failed transcriptions
+                    segments.append(None)
+                    failures.append(failure)
         
         # Save merged transcription
-        output_file = self.save_batch_transcription(transcriptions, selected_indices)
+        output_file = self.save_batch_transcription(transcriptions, selected_indices,
+                                                    selected_urls, segments, failures)
         
         # Summary
         successful = sum(1 for t in transcriptions if t.strip())
         print(f"\nBatch transcription completed!")
         print(f"Successfully transcribed: {successful}/{len(transcriptions)} videos")
+        failed_stages = {}
+        for failure in failures:
+            if failure:
+                stage = failure.split(':', 1)[0]
+                failed_stages[stage] = failed_stages.get(stage, 0) + 1
+        if failed_stages:
+            print(f"Failures by stage: "
+                  f"{', '.join(f'{stage}={count}' for stage, count in sorted(failed_stages.items()))}")
         print(f"Output file: {output_file}")
         
         return output_file
     
-    def save_batch_transcription(self, transcriptions, selected_indices):
-        """Save merged transcriptions from selected videos."""
+    def save_batch_transcription(self, transcriptions, selected_indices, urls=None, segments=None,
+                                 failures=None):
+        """Save merged transcriptions from selected videos and add them to the index.
+        
+        urls, segments and failures, when given, are parallel to
+        transcriptions: they let the index link each video back to its reel
+        and timings, and put the failure reason next to failed videos.
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"instagram_batch_transcription_{timestamp}.txt"
         filepath = self.output_dir / filename
@@ -315,10 +741,23 @@ class InstagramTranscriber:
             for i, transcription in enumerate(transcriptions, 1):
                 if transcription.strip():
                     f.write(f"{transcription.strip()}\n\n")
+                elif failures and failures[i-1]:
+                    f.write(f"[Video {selected_indices[i-1]}: Transcription failed - {failures[i-1]}]\n\n")
                 else:
                     f.write(f"[Video {selected_indices[i-1]}: Transcription failed]\n\n")
         
         print(f"\nBatch transcription saved to: {filepath}")
+        
+        if self.index:
+            for i, transcription in enumerate(transcriptions):
+                if transcription.strip():
+                    self.index.add_transcript(
+                        urls[i] if urls else None,
+                        transcription,
+                        filepath,
+                        segments[i] if segments else None,
+                        video_index=selected_indices[i],
+                    )
         return filepath
 
 
@@ -329,9 +768,139 @@ def main():
     parser.add_argument('-o', '--output', default='transcriptions', 
                         help='Output directory for transcriptions (default: transcriptions)')
     parser.add_argument('-s', '--select', help='Video selection (e.g., "1,3,5" or "1-10" or "2-5,8,10-12")')
+    parser.add_argument('-u', '--username', help='Creator username the URLs file belongs to')
+    parser.add_argument('--sync', action='store_true',
+                        help='Only transcribe reels not seen in previous runs for this creator '
+                             '(requires -f and -u) and append them to the creator corpus')
+    parser.add_argument('--autoscale', action='store_true',
+                        help='Batch mode: download and decode ahead of inference in worker pools '
+                             'that are resized at runtime')
+    parser.add_argument('--max-download-workers', type=int, default=DEFAULT_MAX_DOWNLOAD_WORKERS,
+                        help='Autoscaler limit on concurrent downloads (default: %(default)s)')
+    parser.add_argument('--max-decode-workers', type=int,
+                        help='Autoscaler limit on concurrent decodes (default: CPU cores - 1)')
+    parser.add_argument('--max-queued-audio-mb', type=int,
+                        default=DEFAULT_MAX_QUEUED_AUDIO_BYTES // 1024 ** 2,
+                        help='Autoscaler budget for decoded audio waiting for inference '
+                             '(default: %(default)s)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Single video mode: print and write each segment as soon as it is decoded')
+    parser.add_argument('--backend', default=DEFAULT_BACKEND,
+                        help='Inference backend as name[:model[:compute_type]], e.g. '
+                             '"faster-whisper:medium:int8", "distil-whisper" or "whisper-cpp:small" '
+                             '(default: %(default)s)')
+    parser.add_argument('--media-cache', metavar='DIR',
+                        help='Cache decoded 16 kHz audio here and reuse it on later runs')
+    parser.add_argument('--media-cache-size', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        metavar='MB', help='Media cache size limit in MB (default: %(default)s)')
+    parser.add_argument('--media-cache-dtype', choices=sorted(DTYPES), default='int16',
+                        help='Cached sample format: int16 is compact, float32 needs no '
+                             'conversion at inference (default: %(default)s)')
+    parser.add_argument('--download-timeout', type=float, default=DEFAULT_TIMEOUTS['download'],
+                        help='Seconds allowed per download attempt (default: %(default)s)')
+    parser.add_argument('--decode-timeout', type=float, default=DEFAULT_TIMEOUTS['decode'],
+                        help='Seconds allowed for ffmpeg to decode one video (default: %(default)s)')
+    parser.add_argument('--transcribe-timeout', type=float, default=DEFAULT_TIMEOUTS['transcribe'],
+                        help='Seconds allowed to transcribe one video, checked between '
+                             'segments (default: %(default)s)')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Download attempts per video before giving up (default: %(default)s)')
+    parser.add_argument('--index', help='Full-text index file (default: OUTPUT/transcripts.db)')
+    parser.add_argument('--no-index', action='store_true', help='Do not add transcriptions to the index')
+    parser.add_argument('--search', metavar='QUERY', help='Search indexed transcriptions and exit')
+    parser.add_argument('--reindex', action='store_true',
+                        help='Bulk-index existing transcription files in the output directory and exit')
+    parser.add_argument('--archive', action='store_true',
+                        help='Write single-video transcriptions into the compressed archive '
+                             'instead of individual files')
+    parser.add_argument('--archive-dir', metavar='DIR',
+                        help='Archive directory (default: OUTPUT/archive)')
+    parser.add_argument('--compact', action='store_true',
+                        help='Fold transcription files in the output directory into the archive, '
+                             'keeping the newest per reel, and exit')
+    parser.add_argument('--lookup', metavar='SHORTCODE', help='Print an archived transcription and exit')
+    parser.add_argument('--export', metavar='FILE',
+                        help='Write the newest archived transcription per reel to a JSONL file and exit')
+    parser.add_argument('--profile', action='store_true',
+                        help='Run under the sampling profiler and write PREFIX.collapsed.txt, '
+                             'PREFIX.speedscope.json and PREFIX.summary.txt')
+    parser.add_argument('--profile-prefix', metavar='PREFIX',
+                        help='Profile output prefix (default: OUTPUT/profile_TIMESTAMP)')
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_INTERVAL * 1000, metavar='MS',
+                        help='Milliseconds between profiler samples (default: %(default)s)')
+    parser.add_argument('--queue', help='Shared SQLite work-queue file for distributed batch mode')
+    parser.add_argument('--role', choices=['coordinator', 'worker', 'merge'],
+                        help='Distributed batch role: coordinator (enqueue URLs file), '
+                             'worker (process queued videos) or merge (write merged output)')
     
     args = parser.parse_args()
     
+    try:
+        create_backend(args.backend).check_language(LANGUAGE)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    stage_options = {
+        'timeouts': {'download': args.download_timeout, 'decode': args.decode_timeout,
+                     'transcribe': args.transcribe_timeout},
+        'retry_policy': RetryPolicy(max_attempts=args.retries),
+        'backend': args.backend,
+    }
+    if args.media_cache:
+        stage_options['media_cache'] = MediaCache(args.media_cache,
+                                                  max_bytes=args.media_cache_size * 1024 ** 2,
+                                                  dtype=args.media_cache_dtype)
+    index_path = None if args.no_index else (args.index or str(Path(args.output) / "transcripts.db"))
+    
+    if not (args.profile or args.profile_prefix):
+        run_command(parser, args, index_path, stage_options)
+        return
+    
+    profiler = SamplingProfiler(interval=args.profile_interval / 1000)
+    stage_options['profiler'] = profiler
+    profile_prefix = args.profile_prefix or str(
+        Path(args.output) / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    profiler.start()
+    try:
+        run_command(parser, args, index_path, stage_options)
+    finally:
+        profiler.stop()
+        profiler.save(profile_prefix)
+
+
+def run_command(parser, args, index_path, stage_options):
+    """Run the mode selected on the command line with the configured stage options."""
+    archive = None
+    if args.archive or args.archive_dir or args.compact or args.lookup or args.export:
+        try:
+            archive = TranscriptArchive(args.archive_dir or Path(args.output) / "archive")
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    
+    if args.compact or args.lookup or args.export:
+        # Only compaction touches the search index; lookups and exports leave it alone
+        index = TranscriptIndex(index_path) if args.compact and index_path else None
+        run_archive_command(args, archive, index)
+        return
+    
+    if args.search or args.reindex:
+        if not index_path:
+            print("Error: --search and --reindex cannot be combined with --no-index")
+            sys.exit(1)
+        Path(args.output).mkdir(exist_ok=True)
+        run_index_command(args, TranscriptIndex(index_path))
+        return
+    
+    if args.role:
+        if not args.queue:
+            print("Error: --role requires --queue")
+            parser.print_help()
+            sys.exit(1)
+        run_distributed(args, index_path, stage_options)
+        return
+    
     # Validate arguments
     if not args.url and not args.file:
         print("Error: Please provide either a URL or a URLs file for processing")
@@ -343,8 +912,18 @@ def main():
         parser.print_help()
         sys.exit(1)
     
+    if args.sync and not (args.file and args.username):
+        print("Error: --sync requires a URLs file (-f) and a creator username (-u)")
+        parser.print_help()
+        sys.exit(1)
+    
     # Initialize transcriber
-    transcriber = InstagramTranscriber(args.output)
+    try:
+        transcriber = InstagramTranscriber(args.output, index_path=index_path, archive=archive,
+                                           **stage_options)
+    except BackendUnavailable as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     
     if args.file:
         # Batch processing mode
@@ -360,8 +939,20 @@ def main():
             print("No valid videos selected")
             sys.exit(1)
         
+        if args.sync:
+            selected_urls = [urls[index - 1] for index in selected_indices]
+            sync_creator(transcriber, args.username, selected_urls)
+            return
+        
         # Transcribe selected videos
-        result = transcriber.transcribe_selected_videos(urls, selected_indices)
+        autoscaler = None
+        if args.autoscale:
+            autoscaler = StageAutoscaler(
+                max_download_workers=args.max_download_workers,
+                max_decode_workers=args.max_decode_workers,
+                max_queued_audio_bytes=args.max_queued_audio_mb * 1024 ** 2,
+            )
+        result = transcriber.transcribe_selected_videos(urls, selected_indices, autoscaler)
         
         if result:
             print(f"\nBatch transcription completed successfully!")
@@ -372,7 +963,10 @@ def main():
     else:
         # Single video processing
         print("Single video mode: Processing one video")
-        result = transcriber.transcribe_video(args.url)
+        if args.stream:
+            result = transcriber.transcribe_video_streaming(args.url)
+        else:
+            result = transcriber.transcribe_video(args.url)
         
         if result:
             print(f"\nTranscription completed successfully!")
@@ -382,5 +976,87 @@ def main():
             sys.exit(1)
 
 
+def run_index_command(args, index):
+    """Bulk-index the output directory and/or search the transcript index."""
+    if args.reindex:
+        start = time.time()
+        added = index.index_directory(args.output)
+        print(f"Indexed {added} new transcription files from {args.output} "
+              f"in {time.time() - start:.2f}s")
+    
+    if args.search:
+        hits = index.search(args.search)
+        if not hits:
+            print(f"No transcriptions match: {args.search}")
+            return
+        for hit in hits:
+            reel = hit['url'] or f"{hit['path']} (video {hit['video_index']})"
+            print(f"{reel}")
+            print(f"  [{format_ms(hit['start_ms'])} - {format_ms(hit['end_ms'])}] "
+                  f"start_ms={hit['start_ms']} end_ms={hit['end_ms']}")
+            print(f"  {hit['snippet']}")
+
+
+def run_archive_command(args, archive, index=None):
+    """Compact the output directory into the archive, look up or export transcripts."""
+    if args.compact:
+        start = time.time()
+        stats = archive.compact(args.output, index=index)
+        print(f"Compacted {stats['files']} files from {args.output} into {archive.archive_dir} "
+              f"in {time.time() - start:.2f}s: {stats['archived']} archived, "
+              f"{stats['superseded']} superseded, {stats['skipped']} skipped, "
+              f"{stats['removed']} removed")
+    
+    if args.lookup:
+        record = archive.get(args.lookup)
+        if not record:
+            print(f"No archived transcription for: {args.lookup}")
+            sys.exit(1)
+        print(f"URL: {record['url']}")
+        print(f"Generated: {record['generated']}")
+        print(f"{'='*50}\n")
+        print(record['transcription'])
+    
+    if args.export:
+        count = archive.export(args.export)
+        print(f"Exported {count} transcriptions to: {args.export}")
+
+
+def run_distributed(args, index_path=None, stage_options=None):
+    """Run one role of a distributed batch against a shared work-queue."""
+    queue = WorkQueue(args.queue)
+    
+    if args.role == 'coordinator':
+        if not args.file:
+            print("Error: The coordinator role requires a URLs file (-f)")
+            sys.exit(1)
+        transcriber = InstagramTranscriber(args.output, load_model=False)
+        urls = transcriber.load_urls_from_file(args.file)
+        if not urls:
+            print("No valid URLs found in file")
+            sys.exit(1)
+        selected_indices = transcriber.parse_selection(args.select, len(urls))
+        if not selected_indices:
+            print("No valid videos selected")
+            sys.exit(1)
+        added = queue.enqueue(urls, selected_indices)
+        print(f"Queued {added} new videos ({len(selected_indices)} selected) in: {args.queue}")
+    elif args.role == 'worker':
+        try:
+            transcriber = InstagramTranscriber(args.output, **(stage_options or {}))
+        except BackendUnavailable as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        run_worker(queue, transcriber.transcribe_video_direct,
+                   failure_reason=lambda url: format_failure(transcriber.failures.get(url)))
+    else:
+        transcriber = InstagramTranscriber(args.output, load_model=False, index_path=index_path)
+        result = merge_results(queue, transcriber)
+        if not result:
+            sys.exit(1)
+        print(f"\nBatch transcription completed successfully!")
+        print(f"Output file: {result}")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Media Cache
+On-disk cache of each reel's decoded 16 kHz mono PCM, keyed by shortcode,
+so re-transcribing a corpus with a different model or decoding settings
+needs no network and no ffmpeg.
+
+Samples are stored as raw little-endian arrays and memory-mapped straight
+into inference. int16 halves the disk footprint; float32 is the inference
+dtype itself, so it is handed to the backend with no copy at all.
+"""
+
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+
+SAMPLE_RATE = 16000
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+DTYPES = {
+    'int16': np.dtype('<i2'),
+    'float16': np.dtype('<f2'),
+    'float32': np.dtype('<f4'),
+}
+
+
+def to_float32(samples):
+    """Return samples as float32 in [-1, 1], without copying float32 input."""
+    if samples.dtype == np.float32:
+        return samples
+    if samples.dtype == np.int16:
+        # One pass, one allocation: scale while converting
+        return np.multiply(samples, 1.0 / 32768.0, dtype=np.float32)
+    return samples.astype(np.float32)
+
+
+class MediaCache:
+    """Decoded-audio cache with least-recently-used eviction by total bytes.
+
+    Recency is tracked with file modification times, which get() refreshes,
+    so the cache survives restarts and can be shared between processes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, dtype='int16'):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported cache dtype '{dtype}'. Use one of: {', '.join(DTYPES)}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+
+    def path_for(self, shortcode):
+        return self.cache_dir / f"{shortcode}.{self.dtype}.pcm"
+
+    def get(self, shortcode):
+        """Return the cached samples as a read-only memory map, or None."""
+        path = self.path_for(shortcode)
+        try:
+            if path.stat().st_size == 0:
+                return None
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return np.memmap(path, dtype=DTYPES[self.dtype], mode='r')
+
+    def put(self, shortcode, audio):
+        """Store a pydub AudioSegment as 16 kHz mono PCM and return it memory-mapped."""
+        audio = audio.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(2)
+        samples = np.frombuffer(audio.raw_data, dtype='<i2')
+        if self.dtype == 'float16':
+            samples = np.multiply(samples, 1.0 / 32768.0, dtype=np.float16)
+        elif self.dtype == 'float32':
+            samples = to_float32(samples)
+
+        path = self.path_for(shortcode)
+        # Write under a unique temporary name so concurrent writers and
+        # readers never see a partial file
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        samples.astype(DTYPES[self.dtype], copy=False).tofile(temp_path)
+        os.replace(temp_path, path)
+
+        self.evict(keep=path)
+        return self.get(shortcode)
+
+    def entries(self):
+        """Return (path, size, mtime) for every cached file."""
+        entries = []
+        for path in self.cache_dir.glob('*.pcm'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def total_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Delete least recently used files until the cache fits in max_bytes.
+
+        Returns the number of bytes freed.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            freed += size
+        return freed
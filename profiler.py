@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Sampling Profiler
+Low-overhead wall-clock profiler for transcription runs.
+
+A background thread snapshots every thread's Python stack with
+sys._current_frames() at a fixed interval. Code under profiling marks what
+it is doing with stage(), so each sample is tagged with the pipeline stage
+(download, decode, transcribe, ...) and the video index; anything outside a
+stage is counted as "main". Results are written as collapsed stacks (for
+flamegraph.pl / speedscope), a speedscope JSON file with one profile per
+stage, and a top-N hot-function summary per stage.
+
+Only Python frames are visible: time inside native code (ffmpeg, CTranslate2)
+is attributed to the Python function that called into it.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+DEFAULT_INTERVAL = 0.01
+ROOT_STAGE = 'main'
+
+# Leaf frames of threads that are only waiting on another thread; counting
+# them would report the same work twice (e.g. run_with_timeout's join).
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('threading.py', 'join'),
+    ('queue.py', 'get'),
+}
+
+
+def short_path(filename):
+    """Shorten a source path to its site-packages or working-directory relative form."""
+    marker = 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """Samples all threads every interval seconds while running.
+
+    Use stage() (or bind() for work handed to another thread) to tag the
+    samples; call start()/stop() around the run and save() afterwards.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = Counter()
+        self.sample_count = 0
+        self.overhead = 0.0
+        self.errors = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._tags = {}
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current_tag(self):
+        """(stage, video) the calling thread is tagged with."""
+        tags = self._tags.get(threading.get_ident())
+        return tags[-1] if tags else (ROOT_STAGE, None)
+
+    @contextmanager
+    def stage(self, name=None, video=None):
+        """Tag samples of the calling thread; unset fields inherit the enclosing tag."""
+        current_stage, current_video = self.current_tag()
+        ident = threading.get_ident()
+        outer = self._tags.get(ident, ())
+        # Tag stacks are immutable tuples swapped in whole, so the sampler
+        # thread never sees one half-updated
+        self._tags[ident] = outer + ((name or current_stage, current_video if video is None else video),)
+        try:
+            yield
+        finally:
+            if outer:
+                self._tags[ident] = outer
+            else:
+                self._tags.pop(ident, None)
+
+    def bind(self, fn):
+        """Wrap fn so it runs under the caller's current tag in whichever thread calls it."""
+        stage, video = self.current_tag()
+
+        def tagged(*args, **kwargs):
+            with self.stage(stage, video):
+                return fn(*args, **kwargs)
+        return tagged
+
+    def start(self):
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.monotonic() - self.started
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame):
+        return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            began = time.perf_counter()
+            try:
+                self.sample(skip=own)
+            except Exception as e:
+                # Keep sampling; a lost sample is better than a silently truncated profile
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"Warning: Profiler sample failed: {e}")
+            self.overhead += time.perf_counter() - began
+
+    def sample(self, skip=None):
+        """Take one snapshot of every thread's stack (except skip)."""
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            if not self.include_idle and self._is_idle(frame):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            tags = self._tags.get(ident)
+            stage, video = tags[-1] if tags else (ROOT_STAGE, None)
+            self.samples[(stage, video, tuple(stack))] += 1
+            self.sample_count += 1
+
+    def stages(self):
+        """Sample count per stage, most sampled first."""
+        counts = Counter()
+        for (stage, _, _), count in self.samples.items():
+            counts[stage] += count
+        return counts.most_common()
+
+    def collapsed(self):
+        """Collapsed stack lines "stage;video N;frame;...;leaf count"."""
+        lines = []
+        for (stage, video, stack), count in sorted(self.samples.items(), key=str):
+            roots = [stage] if video is None else [stage, f"video {video}"]
+            lines.append(f"{';'.join(roots + list(stack))} {count}")
+        return lines
+
+    def hot_functions(self, top=10):
+        """Per stage, the top functions by self and by total (inclusive) samples."""
+        self_counts = {}
+        total_counts = {}
+        for (stage, _, stack), count in self.samples.items():
+            if stack:
+                self_counts.setdefault(stage, Counter())[stack[-1]] += count
+            inclusive = total_counts.setdefault(stage, Counter())
+            for label in set(stack):
+                inclusive[label] += count
+        return {
+            stage: {
+                'self': self_counts.get(stage, Counter()).most_common(top),
+                'total': total_counts[stage].most_common(top),
+            }
+            for stage in total_counts
+        }
+
+    def speedscope(self, name="transcription"):
+        """Speedscope file-format dict with one sampled profile per stage."""
+        frames = []
+        frame_index = {}
+
+        def index_of(label):
+            if label not in frame_index:
+                frame_index[label] = len(frames)
+                frames.append({'name': label})
+            return frame_index[label]
+
+        profiles = []
+        for stage, count in self.stages():
+            samples = []
+            weights = []
+            for (sample_stage, video, stack), weight in sorted(self.samples.items(), key=str):
+                if sample_stage != stage:
+                    continue
+                roots = [] if video is None else [f"video {video}"]
+                samples.append([index_of(label) for label in roots + list(stack)])
+                weights.append(weight * self.interval)
+            profiles.append({
+                'type': 'sampled',
+                'name': f"{name}: {stage}",
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': count * self.interval,
+                'samples': samples,
+                'weights': weights,
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'instagram-transcriber profiler',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': profiles,
+        }
+
+    def summary(self, top=10):
+        """Human-readable per-stage report."""
+        total = self.sample_count or 1
+        lines = [
+            f"Profile: {self.sample_count} samples every {self.interval * 1000:.0f}ms over "
+            f"{self.elapsed:.1f}s (sampler overhead {self.overhead:.2f}s)",
+        ]
+        if self.errors:
+            lines.append(f"Warning: {self.errors} samples failed and were dropped")
+        hot = self.hot_functions(top)
+        for stage, count in self.stages():
+            lines.append("")
+            lines.append(f"[{stage}] {count} samples ({count / total * 100:.1f}%), "
+                         f"~{count * self.interval:.1f}s thread time")
+            lines.append(f"  {'Self %':>7} {'Total %':>8}  Function")
+            totals = dict(hot[stage]['total'])
+            for label, self_count in hot[stage]['self']:
+                lines.append(f"  {self_count / count * 100:>7.1f} "
+                             f"{totals.get(label, self_count) / count * 100:>8.1f}  {label}")
+        return "\n".join(lines)
+
+    def save(self, prefix, top=10):
+        """Write PREFIX.collapsed.txt, PREFIX.speedscope.json and PREFIX.summary.txt."""
+        prefix = str(prefix)
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        paths = [f"{prefix}.collapsed.txt", f"{prefix}.speedscope.json", f"{prefix}.summary.txt"]
+        with open(paths[0], 'w', encoding='utf-8') as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        with open(paths[1], 'w', encoding='utf-8') as f:
+            json.dump(self.speedscope(os.path.basename(prefix)), f)
+        summary = self.summary(top)
+        with open(paths[2], 'w', encoding='utf-8') as f:
+            f.write(summary + "\n")
+
+        print(f"\n{summary}")
+        print(f"\nProfile saved to: {', '.join(paths)}")
+        return paths
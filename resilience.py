@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Resilience
+Deadlines, retry policy and a circuit breaker for the download, decode and
+transcribe stages, so one bad input cannot stall or silently break a batch.
+"""
+
+import random
+import re
+import subprocess
+import threading
+import time
+
+
+DEFAULT_TIMEOUTS = {
+    'download': 300,
+    'decode': 300,
+    'transcribe': 1800,
+}
+
+RATE_LIMIT_PATTERN = re.compile(
+    r'\b429\b|too many requests|rate.?limit|please wait a few minutes',
+    re.IGNORECASE,
+)
+
+# Errors that will not go away by retrying the same URL
+PERMANENT_ERROR_PATTERN = re.compile(
+    r'unsupported url|private|does not exist|removed|no video formats',
+    re.IGNORECASE,
+)
+
+
+class StageTimeout(Exception):
+    """Raised when a pipeline stage runs past its deadline."""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"timeout after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def run_with_timeout(stage, timeout, fn, *args, **kwargs):
+    """Run fn in a worker thread and raise StageTimeout if it exceeds timeout.
+
+    Python cannot kill a thread, so on timeout the call is abandoned and left
+    to finish in the background (it is a daemon thread); the caller moves on.
+    A timeout of None or 0 calls fn directly.
+    """
+    if not timeout:
+        return fn(*args, **kwargs)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name=f"{stage}-stage", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise StageTimeout(stage, timeout)
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+
+def run_process(stage, timeout, args):
+    """Run a subprocess and return its stdout; kill it and raise StageTimeout past timeout.
+
+    Unlike run_with_timeout, nothing is left running when the deadline hits,
+    so a pathological input cannot keep burning CPU in the background.
+    """
+    try:
+        result = subprocess.run(args, capture_output=True, timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        # subprocess.run has already killed and reaped the process
+        raise StageTimeout(stage, timeout)
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', errors='replace').strip().splitlines()
+        raise RuntimeError(message[-1] if message else f"{args[0]} exited with {result.returncode}")
+    return result.stdout
+
+
+def is_rate_limited(message):
+    """Check whether an error message looks like Instagram throttling us."""
+    return bool(RATE_LIMIT_PATTERN.search(str(message)))
+
+
+def is_permanent_error(message):
+    """Check whether an error message describes a failure retrying cannot fix."""
+    return not is_rate_limited(message) and bool(PERMANENT_ERROR_PATTERN.search(str(message)))
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for retrying failed downloads."""
+
+    def __init__(self, max_attempts=3, base_delay=5.0, max_delay=120.0,
+                 multiplier=2.0, jitter=0.1):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        """Seconds to wait after the given (1-based) failed attempt."""
+        delay = min(self.base_delay * (self.multiplier ** (attempt - 1)), self.max_delay)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class CircuitBreaker:
+    """Pause downloads after repeated rate-limit failures.
+
+    After failure_threshold consecutive rate-limited downloads the breaker
+    opens and wait_if_open() blocks callers for cooldown seconds. The next
+    download is a probe: success closes the breaker, another rate-limit
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=300.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_rate_limit(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"Circuit breaker open: Instagram is rate-limiting, "
+                          f"pausing downloads for {self.cooldown:g}s")
+                self.opened_at = self.clock()
+
+    def wait_if_open(self):
+        """Block until the cooldown has passed if the breaker is open."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            remaining = self.opened_at + self.cooldown - self.clock()
+        if remaining > 0:
+            print(f"Downloads paused by circuit breaker, resuming in {remaining:.0f}s")
+            self.sleep(remaining)
+        return max(remaining, 0.0)
+
+
+def format_failure(failure):
+    """Render a (stage, reason) failure as 'stage: reason'."""
+    if not failure:
+        return "unknown error"
+    stage, reason = failure
+    return f"{stage}: {reason}"
@@ -7,24 +7,16 @@ Tests the transcriber against known expected transcriptions.
 import os
 import sys
 from pathlib import Path
-from difflib import SequenceMatcher
-import re
 
+# Add the parent directory to the path so we can import evaluation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def clean_text(text):
-    """Clean text for comparison by removing extra whitespace and normalizing."""
-    # Remove extra whitespace and normalize
-    text = re.sub(r'\s+', ' ', text.strip())
-    # Remove punctuation differences
-    text = re.sub(r'[.,!?;:]', '', text)
-    return text.lower()
+from evaluation import character_error_rate, evaluate_pair
 
 
 def calculate_similarity(text1, text2):
-    """Calculate similarity between two texts using SequenceMatcher."""
-    clean1 = clean_text(text1)
-    clean2 = clean_text(text2)
-    return SequenceMatcher(None, clean1, clean2).ratio()
+    """Calculate similarity between two texts as 1 - CER (clamped at 0)."""
+    return max(0.0, 1.0 - character_error_rate(text1, text2))
 
 
 def load_expected_transcription(file_path):
@@ -129,11 +121,12 @@ def test_transcription_accuracy():
             continue
         
         # Calculate similarity
-        similarity = calculate_similarity(expected, generated)
-        percentage = similarity * 100
+        scores = evaluate_pair(video_id, expected, generated)
+        percentage = max(0.0, 1.0 - scores['cer']) * 100
         
         print(f"Expected length: {len(expected)} characters")
         print(f"Generated length: {len(generated)} characters")
+        print(f"WER: {scores['wer'] * 100:.1f}%  CER: {scores['cer'] * 100:.1f}%")
         print(f"Similarity: {percentage:.1f}%")
         
         if percentage >= 95:
@@ -148,6 +141,7 @@ def test_transcription_accuracy():
         results.append({
             'description': test['description'],
             'similarity': percentage,
+            'wer': scores['wer'] * 100,
             'expected_length': len(expected),
             'generated_length': len(generated)
         })
@@ -161,6 +155,7 @@ def test_transcription_accuracy():
         print("SUMMARY")
         print("=" * 20)
         print(f"Average accuracy: {avg_similarity:.1f}%")
+        print(f"Average WER: {sum(r['wer'] for r in results) / len(results):.1f}%")
         print(f"Tests passed: {len([r for r in results if r['similarity'] >= 90])}/{len(results)}")
         
         print("\nDetailed Results:")
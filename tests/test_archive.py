@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Test suite for the compressed transcript archive
+"""
+
+import pytest
+import os
+import gzip
+import json
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+import main
+from main import InstagramTranscriber
+from archive import TranscriptArchive, read_transcription_file
+from transcript_index import TranscriptIndex
+from tests.test_backends import FakeBackend
+
+
+def write_transcription(directory, shortcode, generated, text):
+    """Write a file in the save_transcription format"""
+    stamp = generated.replace('-', '').replace(':', '').replace(' ', '_')
+    path = Path(directory) / f"instagram_{shortcode}_transcription_{stamp}.txt"
+    path.write_text(
+        f"Instagram Video Transcription\n"
+        f"URL: https://www.instagram.com/reel/{shortcode}/\n"
+        f"Generated: {generated}\n"
+        f"{'=' * 50}\n\n{text}",
+        encoding='utf-8',
+    )
+    return path
+
+
+class TestTranscriptArchive:
+    """Test cases for appending, lookup and compaction"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = TranscriptArchive(os.path.join(self.temp_dir, "archive"), codec='gz')
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_append_and_lookup(self):
+        """Test that a transcript round-trips by shortcode"""
+        segments = [{'start': 0.0, 'end': 1.5, 'text': ' Olá'}]
+        location = self.archive.append("https://www.instagram.com/reel/ABC123/", "Olá", segments=segments)
+
+        assert location.endswith("#ABC123")
+        record = self.archive.get("ABC123")
+        assert record['transcription'] == "Olá"
+        assert record['segments'] == segments
+        assert "ABC123" in self.archive
+        assert self.archive.get("MISSING") is None
+
+    def test_newest_record_wins(self):
+        """Test that only a newer transcript replaces the archived one"""
+        url = "https://www.instagram.com/reel/ABC123/"
+        self.archive.append(url, "second", generated="2024-09-21 10:00:00")
+        assert self.archive.append(url, "first", generated="2024-09-20 10:00:00") is None
+        self.archive.append(url, "third", generated="2024-09-22 10:00:00")
+
+        assert self.archive.get("ABC123")['transcription'] == "third"
+        assert len(self.archive) == 1
+
+    def test_shards_are_valid_multi_member_files(self):
+        """Test that each record is its own frame and the shard decompresses as JSONL"""
+        for i in range(3):
+            self.archive.append(f"https://www.instagram.com/reel/S{i}/", f"text {i}")
+
+        shard = self.archive.shards()[0]
+        with gzip.open(shard, 'rt', encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        assert [line['shortcode'] for line in lines] == ["S0", "S1", "S2"]
+
+    def test_shard_rotation(self):
+        """Test that appends roll over to a new shard past the size limit"""
+        archive = TranscriptArchive(os.path.join(self.temp_dir, "small"), max_shard_bytes=200, codec='gz')
+        for i in range(5):
+            archive.append(f"https://www.instagram.com/reel/R{i}/", os.urandom(64).hex())
+
+        assert len(archive.shards()) > 1
+        assert [archive.get(f"R{i}") is not None for i in range(5)] == [True] * 5
+
+    def test_zstd_requires_package(self):
+        """Test that asking for zstd without zstandard is a clear error"""
+        with patch('archive.zstandard', None):
+            with pytest.raises(ValueError):
+                TranscriptArchive(os.path.join(self.temp_dir, "zst"), codec='zst')
+
+    def test_compact_keeps_newest_and_removes_files(self):
+        """Test folding a directory with duplicates into the archive"""
+        out = Path(self.temp_dir)
+        write_transcription(out, "DUP1", "2024-09-20 10:00:00", "old")
+        write_transcription(out, "DUP1", "2024-09-21 10:00:00", "new")
+        write_transcription(out, "ONE2", "2024-09-20 11:00:00", "único")
+        batch = out / "instagram_batch_transcription_20240920_100000.txt"
+        batch.write_text("Instagram Batch Transcription\n" + "=" * 60 + "\n\ntext\n", encoding='utf-8')
+
+        stats = self.archive.compact(out)
+
+        assert stats == {'files': 4, 'archived': 2, 'superseded': 1, 'skipped': 1, 'removed': 3}
+        assert self.archive.get("DUP1")['transcription'] == "new"
+        assert self.archive.get("ONE2")['transcription'] == "único"
+        assert [p.name for p in out.glob("instagram_*.txt")] == [batch.name]
+
+    def test_compact_does_not_replace_newer_archive(self):
+        """Test that an old file left on disk does not override the archive"""
+        url = "https://www.instagram.com/reel/KEEP1/"
+        self.archive.append(url, "archived", generated="2024-09-22 10:00:00")
+        write_transcription(self.temp_dir, "KEEP1", "2024-09-20 10:00:00", "stale")
+
+        stats = self.archive.compact(self.temp_dir)
+        assert stats['archived'] == 0
+        assert self.archive.get("KEEP1")['transcription'] == "archived"
+
+    def test_compact_updates_search_index(self):
+        """Test that search only returns the archived newest copy after compaction"""
+        index = TranscriptIndex(os.path.join(self.temp_dir, "transcripts.db"))
+        for generated, text in (("2024-09-20 10:00:00", "banana velha"),
+                                ("2024-09-21 10:00:00", "banana nova")):
+            path = write_transcription(self.temp_dir, "IDX1", generated, text)
+            index.add_transcript("https://www.instagram.com/reel/IDX1/", text, path)
+
+        self.archive.compact(self.temp_dir, index=index)
+
+        hits = index.search("banana")
+        assert len(hits) == 1
+        assert hits[0]['path'] == self.archive.location("IDX1")
+        assert "nova" in hits[0]['snippet']
+        assert index.search("velha") == []
+
+    def test_export(self):
+        """Test that export writes one line per shortcode"""
+        url = "https://www.instagram.com/reel/EXP1/"
+        self.archive.append(url, "one", generated="2024-09-20 10:00:00")
+        self.archive.append(url, "two", generated="2024-09-21 10:00:00")
+        self.archive.append("https://www.instagram.com/reel/EXP2/", "three")
+
+        path = os.path.join(self.temp_dir, "export.jsonl")
+        assert self.archive.export(path) == 2
+        with open(path, encoding='utf-8') as f:
+            texts = sorted(json.loads(line)['transcription'] for line in f)
+        assert texts == ["three", "two"]
+
+    def test_read_transcription_file(self):
+        """Test parsing the single-video file format"""
+        path = write_transcription(self.temp_dir, "READ1", "2024-09-20 10:00:00", "Olá mundo")
+        assert read_transcription_file(path) == (
+            "https://www.instagram.com/reel/READ1/", "2024-09-20 10:00:00", "Olá mundo")
+
+
+class TestArchiveOutput:
+    """Test cases for writing new runs directly into the archive"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive = TranscriptArchive(os.path.join(self.temp_dir, "archive"), codec='gz')
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend(),
+                                                archive=self.archive)
+        self.url = "https://www.instagram.com/reel/ARCH1/"
+        self.load_audio = patch.object(self.transcriber, 'load_audio',
+                                       return_value=AudioSegment.silent(duration=500))
+        self.load_audio.start()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        self.load_audio.stop()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_transcribe_video_writes_archive(self):
+        """Test that single mode appends to the archive instead of creating a file"""
+        location = self.transcriber.transcribe_video(self.url)
+
+        assert location == self.archive.location("ARCH1")
+        assert self.archive.get("ARCH1")['transcription'].split() == ["Olá", "mundo"]
+        assert list(Path(self.temp_dir).glob("instagram_*.txt")) == []
+
+    def test_rerun_replaces_indexed_copy(self):
+        """Test that re-archiving a reel leaves one searchable document"""
+        self.transcriber.index = TranscriptIndex(os.path.join(self.temp_dir, "transcripts.db"))
+        self.transcriber.transcribe_video(self.url)
+        self.transcriber.transcribe_video(self.url)
+
+        hits = self.transcriber.index.search("mundo")
+        assert [hit['path'] for hit in hits] == [self.archive.location("ARCH1")]
+
+    def test_url_without_shortcode_is_saved_to_a_file(self):
+        """Test that a transcript the archive cannot key is written to a file, not lost"""
+        url = "https://www.instagram.com/tv/"
+        with patch('builtins.print') as printed:
+            path = self.transcriber.save_transcription("sem código", url)
+
+        assert Path(path).parent == Path(self.temp_dir)
+        assert Path(path).read_text(encoding='utf-8').endswith("sem código")
+        assert len(self.archive) == 0
+        lines = [call.args[0] for call in printed.call_args_list if call.args]
+        assert not any("already archived" in line for line in lines)
+
+    def test_superseded_record_keeps_archived_copy(self):
+        """Test the newer-copy-wins message when the archive already has a newer record"""
+        self.archive.append(self.url, "futuro", generated="2999-01-01 00:00:00")
+        with patch('builtins.print') as printed:
+            location = self.transcriber.save_transcription("agora", self.url)
+
+        assert location == self.archive.location("ARCH1")
+        assert self.archive.get("ARCH1")['transcription'] == "futuro"
+        printed.assert_any_call(f"A newer transcription of {self.url} is already archived")
+
+    def test_streaming_writes_archive(self):
+        """Test that the live streaming file is folded into the archive when done"""
+        location = self.transcriber.transcribe_video_streaming(self.url)
+
+        assert location == self.archive.location("ARCH1")
+        record = self.archive.get("ARCH1")
+        assert [segment['text'] for segment in record['segments']] == [' Olá', ' mundo']
+        assert list(Path(self.temp_dir).glob("instagram_*.txt")) == []
+
+
+class TestArchiveOption:
+    """Test cases for the --archive command line options"""
+
+    def parse(self, argv):
+        captured = {}
+
+        def fake_run_command(parser, args, index_path, stage_options):
+            captured['args'] = args
+
+        with patch.object(sys, 'argv', ['main.py'] + argv), \
+                patch('main.run_command', side_effect=fake_run_command):
+            main.main()
+        return captured['args']
+
+    def test_archive_flag_keeps_positional_url(self):
+        """Test that --archive does not swallow the URL"""
+        url = "https://www.instagram.com/reel/ABC/"
+        args = self.parse(['--archive', url])
+        assert args.archive is True
+        assert args.url == url
+        assert args.archive_dir is None
+
+    def test_lookup_and_export_leave_index_alone(self):
+        """Test that only --compact opens the search index"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            archive_dir = os.path.join(temp_dir, "archive")
+            TranscriptArchive(archive_dir).append("https://www.instagram.com/reel/LOOK1/", "texto")
+            index_path = os.path.join(temp_dir, "transcripts.db")
+            export_path = os.path.join(temp_dir, "out.jsonl")
+            argv = ['main.py', '-o', temp_dir, '--archive-dir', archive_dir]
+            with patch('builtins.print'):
+                for extra in (['--lookup', 'LOOK1'], ['--export', export_path]):
+                    with patch.object(sys, 'argv', argv + extra):
+                        main.main()
+            assert not os.path.exists(index_path)
+
+            with patch.object(sys, 'argv', argv + ['--compact']), patch('builtins.print'):
+                main.main()
+            assert os.path.exists(index_path)
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_archive_dir(self):
+        """Test that the archive location has its own option"""
+        args = self.parse(['--archive', '--archive-dir', 'store', 'https://www.instagram.com/reel/ABC/'])
+        assert args.archive_dir == 'store'
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Test suite for the pipelined, autoscaled batch mode
+"""
+
+import pytest
+import os
+import queue
+import threading
+import tempfile
+import shutil
+import time
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+from main import InstagramTranscriber
+from autoscaler import StageAutoscaler, StagePool, audio_nbytes, run_pipeline
+from tests.test_backends import FakeBackend
+
+
+class FakePool:
+    """Stand-in for StagePool exposing only what the autoscaler reads"""
+
+    def __init__(self, name, target=1, backlog=0):
+        self.name = name
+        self.target = target
+        self.completed = 0
+        self.inbox = queue.Queue()
+        for _ in range(backlog):
+            self.inbox.put(None)
+
+    def resize(self, target):
+        self.target = target
+
+
+class TestStageAutoscaler:
+    """Test cases for scaling decisions"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.autoscaler = StageAutoscaler(max_download_workers=3, max_decode_workers=2,
+                                          max_queued_audio_bytes=1000)
+
+    def step(self, download, decode, ready=0, queued=0):
+        self.autoscaler.step(download, decode, ready, queued, False, 0, 1.0)
+
+    def test_starving_inference_grows_decode_first(self):
+        """Test that a decode backlog is served before fetching further ahead"""
+        download, decode = FakePool('download', backlog=5), FakePool('decode', backlog=2)
+        self.step(download, decode)
+        assert decode.target == 2
+        assert download.target == 1
+
+    def test_starving_inference_grows_downloads(self):
+        """Test that downloads scale up to their limit when decode is idle"""
+        download, decode = FakePool('download', backlog=5), FakePool('decode')
+        for _ in range(5):
+            self.step(download, decode)
+        assert download.target == 3
+        assert [d['to'] for d in self.autoscaler.decisions] == [2, 3]
+        assert self.autoscaler.decisions[0]['reason'] == "inference starving, downloads behind"
+
+    def test_piled_up_audio_shrinks_downloads(self):
+        """Test that a full ready queue removes download workers"""
+        download, decode = FakePool('download', target=3, backlog=5), FakePool('decode')
+        self.step(download, decode, ready=4)
+        assert download.target == 2
+
+    def test_memory_budget(self):
+        """Test that queued audio over the budget pauses downloads, then decodes"""
+        download, decode = FakePool('download', target=1, backlog=5), FakePool('decode', target=1)
+        self.step(download, decode, ready=0, queued=2000)
+        assert download.target == 0
+        self.step(download, decode, ready=0, queued=2000)
+        assert decode.target == 0
+        assert self.autoscaler.decisions[-1]['reason'] == "decoded audio over memory budget"
+
+    def test_paused_stage_resumes_when_starving(self):
+        """Test that a paused download pool is restarted once inference runs dry"""
+        download, decode = FakePool('download', target=0, backlog=5), FakePool('decode')
+        self.step(download, decode)
+        assert download.target == 1
+
+    def test_idle_inference_resumes_paused_stage_immediately(self):
+        """Test that resume_paused restarts a paused stage without waiting for step"""
+        download, decode = FakePool('download', target=0, backlog=5), FakePool('decode', target=0)
+        assert self.autoscaler.resume_paused(download, decode, ready=1, queued_audio_bytes=0) is False
+        assert self.autoscaler.resume_paused(download, decode, ready=0, queued_audio_bytes=0) is True
+        assert (download.target, decode.target) == (1, 0)
+        assert self.autoscaler.decisions[-1]['reason'] == "inference idle, resuming paused stage"
+
+    def test_downloads_not_scaled_past_high_watermark(self):
+        """Test that download workers stop growing at the number of slots ahead of inference"""
+        autoscaler = StageAutoscaler(max_download_workers=8, high_watermark=2)
+        download, decode = FakePool('download', backlog=5), FakePool('decode')
+        for _ in range(5):
+            autoscaler.step(download, decode, 0, 0, False, 0, 1.0)
+        assert download.target == 2
+
+    def test_no_decision_when_balanced(self):
+        """Test that nothing is logged while inference has work queued"""
+        self.step(FakePool('download', backlog=5), FakePool('decode', backlog=2), ready=2)
+        assert self.autoscaler.decisions == []
+
+
+class TestStagePool:
+    """Test cases for resizable worker pools"""
+
+    def test_resize_processes_all_items(self):
+        """Test that every item is processed across resizes"""
+        inbox = queue.Queue()
+        done = queue.Queue()
+        pool = StagePool('test', done.put, inbox, size=1)
+        for item in range(10):
+            inbox.put(item)
+        pool.resize(4)
+        pool.resize(2)
+        results = sorted(done.get(timeout=5) for _ in range(10))
+        pool.close()
+        assert results == list(range(10))
+
+    def test_pause_and_resume(self):
+        """Test that a pool resized to 0 stops taking items until resized again"""
+        inbox = queue.Queue()
+        done = queue.Queue()
+        pool = StagePool('test', done.put, inbox, size=1)
+        pool.resize(0)
+        time.sleep(0.3)
+        inbox.put(1)
+        with pytest.raises(queue.Empty):
+            done.get(timeout=0.3)
+        pool.resize(1)
+        assert done.get(timeout=5) == 1
+        pool.close()
+
+    def test_worker_survives_exceptions(self):
+        """Test that an exception in fn does not kill the worker"""
+        inbox = queue.Queue()
+        done = queue.Queue()
+
+        def fn(item):
+            if item == 0:
+                raise RuntimeError("boom")
+            done.put(item)
+
+        pool = StagePool('test', fn, inbox)
+        inbox.put(0)
+        inbox.put(1)
+        assert done.get(timeout=5) == 1
+        pool.close()
+
+
+class TestPipeline:
+    """Test cases for run_pipeline and batch integration"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend())
+        self.urls = [f"https://www.instagram.com/reel/PIPE{i}/" for i in range(1, 7)]
+
+        def slow_download(url):
+            time.sleep(0.05)
+            if url.endswith("PIPE3/"):
+                self.transcriber._record_failure('download', "private video")
+                return None
+            return os.path.join(self.temp_dir, url.rstrip('/').rsplit('/', 1)[1] + ".mp4")
+
+        self.download = patch.object(self.transcriber, 'download_video', side_effect=slow_download)
+        self.extract = patch.object(self.transcriber, 'extract_audio',
+                                    return_value=AudioSegment.silent(duration=500))
+        self.download.start()
+        self.extract.start()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        self.download.stop()
+        self.extract.stop()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_results_keep_positions_and_failures(self):
+        """Test that results map back to positions with per-stage failures"""
+        jobs = list(enumerate(self.urls + ["not_a_url"], 1))
+        results = run_pipeline(self.transcriber, jobs, StageAutoscaler(interval=0.02))
+
+        assert sorted(results) == list(range(1, 8))
+        assert results[1][0].split() == ["Olá", "mundo"]
+        assert results[3] == (None, None, ('download', "private video"))
+        assert results[7][2][0] == 'validate'
+
+    def test_downloads_scale_up_when_inference_starves(self):
+        """Test that a slow download stage gets more workers, and it is logged"""
+        autoscaler = StageAutoscaler(max_download_workers=4, interval=0.02)
+        run_pipeline(self.transcriber, list(enumerate(self.urls, 1)), autoscaler)
+
+        scale_ups = [d for d in autoscaler.decisions if d['stage'] == 'download' and d['to'] > d['from']]
+        assert scale_ups
+        assert all(d['to'] <= 4 for d in autoscaler.decisions)
+        assert {'download_backlog', 'ready', 'queued_audio_bytes', 'rates'} <= set(scale_ups[0]['metrics'])
+
+    def test_batch_output_matches_serial_order(self):
+        """Test that the autoscaled batch file lists videos in selection order"""
+        output_file = self.transcriber.transcribe_selected_videos(
+            self.urls, [6, 3, 1], StageAutoscaler(interval=0.02))
+        content = output_file.read_text(encoding='utf-8')
+
+        blocks = content.split("=" * 60)[1].strip().split("\n\n")
+        assert len(blocks) == 3
+        assert blocks[1] == "[Video 3: Transcription failed - download: private video]"
+        assert blocks[0].split() == blocks[2].split() == ["Olá", "mundo"]
+        assert self.transcriber.failures[self.urls[2]] == ('download', "private video")
+
+    def test_queued_audio_stays_within_budget(self):
+        """Test that decoding waits for inference instead of buffering the whole batch"""
+        class SlowInference(FakeBackend):
+            def transcribe(self, audio, language="pt"):
+                time.sleep(0.02)
+                yield from super().transcribe(audio, language)
+
+        self.transcriber.backend = SlowInference()
+        self.download.stop()
+        self.download = patch.object(self.transcriber, 'download_video',
+                                     side_effect=lambda url: os.path.join(self.temp_dir, "v.mp4"))
+        self.download.start()
+        # Each decoded clip is 16000 bytes (0.5s of 16 kHz mono int16)
+        item = audio_nbytes(AudioSegment.silent(duration=500, frame_rate=16000))
+        autoscaler = StageAutoscaler(max_download_workers=4, max_decode_workers=4,
+                                     max_queued_audio_bytes=3 * item, interval=0.02)
+        urls = [f"https://www.instagram.com/reel/BUDGET{i}/" for i in range(40)]
+        self.extract.stop()
+        self.extract = patch.object(self.transcriber, 'extract_audio',
+                                    return_value=AudioSegment.silent(duration=500, frame_rate=16000))
+        self.extract.start()
+
+        results = run_pipeline(self.transcriber, list(enumerate(urls, 1)), autoscaler)
+
+        assert len(results) == 40
+        assert all(text for text, _, _ in results.values())
+        assert 0 < autoscaler.peak_queued_audio_bytes <= 3 * item
+
+    def test_concurrent_downloads_reserve_slots(self):
+        """Test that racing download workers never get more than high_watermark videos ahead"""
+        class EagerAutoscaler(StageAutoscaler):
+            # Far more workers than slots, so they all race for them
+            def step(self, download, decode, *args):
+                download.resize(6)
+                decode.resize(6)
+
+        counts = {'started': 0, 'consumed': 0, 'peak_ahead': 0}
+
+        def instant_download(url):
+            with lock:
+                counts['started'] += 1
+                counts['peak_ahead'] = max(counts['peak_ahead'], counts['started'] - counts['consumed'])
+            return os.path.join(self.temp_dir, "v.mp4")
+
+        class SlowInference(FakeBackend):
+            def transcribe(self, audio, language="pt"):
+                time.sleep(0.02)
+                yield from super().transcribe(audio, language)
+                with lock:
+                    counts['consumed'] += 1
+
+        lock = threading.Lock()
+        self.transcriber.backend = SlowInference()
+        self.download.stop()
+        self.download = patch.object(self.transcriber, 'download_video', side_effect=instant_download)
+        self.download.start()
+        urls = [f"https://www.instagram.com/reel/SLOT{i}/" for i in range(30)]
+
+        results = run_pipeline(self.transcriber, list(enumerate(urls, 1)),
+                               EagerAutoscaler(high_watermark=2, interval=0.01))
+
+        assert len(results) == 30
+        # Two slots ahead of inference, plus the video being transcribed
+        assert counts['peak_ahead'] <= 2 + 1
+
+    def test_paused_stage_resumes_without_controller_tick(self):
+        """Test that inference does not sit idle until the next autoscaler step"""
+        class PausingAutoscaler(StageAutoscaler):
+            # Pause downloads on the first tick, then never step again
+            def step(self, download, decode, *args):
+                self.interval = 60
+                download.resize(0)
+
+        autoscaler = PausingAutoscaler(interval=0.01)
+        started = time.monotonic()
+        results = run_pipeline(self.transcriber, list(enumerate(self.urls, 1)), autoscaler)
+
+        assert len(results) == len(self.urls)
+        assert time.monotonic() - started < 10
+        assert any(d['reason'] == "inference idle, resuming paused stage" for d in autoscaler.decisions)
+
+    def test_duplicate_positions_are_rejected(self):
+        """Test that jobs sharing a position fail fast instead of never completing"""
+        with pytest.raises(ValueError):
+            run_pipeline(self.transcriber, [(1, self.urls[0]), (1, self.urls[1])], StageAutoscaler())
+
+    def test_audio_nbytes(self):
+        """Test memory accounting for arrays and AudioSegments"""
+        import numpy as np
+        assert audio_nbytes(None) == 0
+        assert audio_nbytes(np.zeros(10, dtype=np.float32)) == 40
+        assert audio_nbytes(AudioSegment.silent(duration=1000, frame_rate=16000)) == 32000
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test suite for pluggable inference backends and the benchmark harness
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+import main
+from main import InstagramTranscriber
+from backends import (BackendUnavailable, DistilWhisperBackend, FasterWhisperBackend,
+                      InferenceBackend, WhisperCppBackend, create_backend)
+from benchmark_backends import build_corpus, find_corpus, fixture_urls, summarize
+
+
+class FakeBackend(InferenceBackend):
+    """Backend returning canned segments without loading a model"""
+
+    name = "fake"
+    default_model = "none"
+
+    def load(self):
+        self.model = object()
+
+    def transcribe(self, audio, language="pt"):
+        self.received = audio
+        yield {'start': 0.0, 'end': 1.0, 'text': ' Olá'}
+        yield {'start': 1.0, 'end': 2.0, 'text': ' mundo'}
+
+
+class TestBackendRegistry:
+    """Test cases for backend specs"""
+
+    def test_default_backend_matches_previous_model(self):
+        """Test that the default is faster-whisper small int8 on CPU"""
+        backend = create_backend()
+        assert isinstance(backend, FasterWhisperBackend)
+        assert (backend.model_name, backend.compute_type, backend.device) == ("small", "int8", "cpu")
+
+    def test_spec_parsing(self):
+        """Test name:model:compute_type specs"""
+        backend = create_backend("faster-whisper:medium:int8_float32")
+        assert backend.spec == "faster-whisper:medium:int8_float32"
+        assert isinstance(create_backend("distil-whisper"), DistilWhisperBackend)
+        assert create_backend("whisper-cpp:base").model_name == "base"
+
+    def test_unknown_backend(self):
+        """Test that an unknown backend name is rejected"""
+        with pytest.raises(ValueError):
+            create_backend("openvino:small")
+
+    def test_distil_disables_previous_text_conditioning(self):
+        """Test distil-whisper decoding options"""
+        options = create_backend("distil-whisper").transcribe_options()
+        assert options['condition_on_previous_text'] is False
+
+    def test_backend_missing_a_method_fails_at_construction(self):
+        """Test that the base class is abstract"""
+        class NoTranscribe(InferenceBackend):
+            name = "broken"
+
+            def load(self):
+                pass
+
+        with pytest.raises(TypeError):
+            NoTranscribe()
+
+    def test_distil_english_only_checkpoints_refuse_portuguese(self):
+        """Test that the English-only default is rejected for pt, not run"""
+        with pytest.raises(ValueError, match="English-only"):
+            create_backend("distil-whisper").check_language("pt")
+        create_backend("distil-whisper").check_language("en")
+        create_backend("distil-whisper:/models/distil-pt-ct2").check_language("pt")
+        with pytest.raises(ValueError):
+            InstagramTranscriber(output_dir=tempfile.gettempdir(), load_model=False,
+                                 backend="distil-whisper")
+
+    def test_whisper_cpp_unavailable(self):
+        """Test a clear error when pywhispercpp is not installed"""
+        with patch.dict(sys.modules, {'pywhispercpp': None, 'pywhispercpp.model': None}):
+            with pytest.raises(BackendUnavailable):
+                WhisperCppBackend().load()
+
+
+class TestTranscriberBackend:
+    """Test cases for transcribe_audio with a pluggable backend"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend())
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_transcribe_audio_uses_backend(self):
+        """Test that transcribe_audio joins backend segments and keeps timings"""
+        result = self.transcriber.transcribe_audio(AudioSegment.silent(duration=500))
+
+        assert result.split() == ["Olá", "mundo"]
+        assert self.transcriber.backend.received.endswith(".wav")
+        assert self.transcriber.last_segments[1]['end'] == 2.0
+
+
+class TestBackendOption:
+    """Test cases for --backend errors on the command line"""
+
+    def run_main(self, argv):
+        with patch.object(sys, 'argv', ['main.py'] + argv), \
+                patch('builtins.print') as printed:
+            with pytest.raises(SystemExit) as exit_info:
+                main.main()
+        return exit_info.value.code, [call.args[0] for call in printed.call_args_list if call.args]
+
+    def test_missing_optional_backend_is_a_clean_error(self):
+        """Test that BackendUnavailable is reported as an Error: line, not a traceback"""
+        with patch.dict(sys.modules, {'pywhispercpp': None, 'pywhispercpp.model': None}):
+            code, lines = self.run_main(['--backend', 'whisper-cpp', '--no-index',
+                                         '-o', tempfile.gettempdir(),
+                                         'https://www.instagram.com/reel/ABC/'])
+        assert code == 1
+        assert "Error: whisper-cpp backend requires: pip install pywhispercpp" in lines
+
+    def test_english_only_backend_is_a_clean_error(self):
+        """Test that an English-only checkpoint is refused before anything runs"""
+        code, lines = self.run_main(['--backend', 'distil-whisper', 'https://www.instagram.com/reel/ABC/'])
+        assert code == 1
+        assert lines[0].startswith("Error: distil-large-v3 is English-only")
+
+
+class TestBenchmarkHarness:
+    """Test cases for the backend comparison harness"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_find_corpus_uses_test_data_transcripts(self):
+        """Test that fixtures pick up expected transcripts from tests/test_data"""
+        Path(self.temp_dir, "sample_1.wav").touch()
+        Path(self.temp_dir, "orphan.wav").touch()
+
+        pairs = find_corpus(self.temp_dir)
+
+        assert [(a.name, e.name) for a, e in pairs] == [("sample_1.wav", "sample_1.txt")]
+
+    def test_fixture_urls(self):
+        """Test that every sample transcript names the reel it was made from"""
+        fixtures = dict(fixture_urls())
+        assert sorted(fixtures) == ["sample_1", "sample_2", "sample_3", "sample_4"]
+        assert fixtures["sample_1"].startswith("https://www.instagram.com/reel/DIy_O6Ctilf/")
+
+    def test_build_corpus(self):
+        """Test that missing fixtures are fetched as WAV files and existing ones kept"""
+        corpus = Path(self.temp_dir) / "audio"
+        corpus.mkdir()
+        (corpus / "sample_1.wav").write_bytes(b"existing")
+
+        class FakeTranscriber:
+            def __init__(self):
+                self.fetched = []
+
+            def load_audio(self, url):
+                self.fetched.append(url)
+                return AudioSegment.silent(duration=100, frame_rate=16000)
+
+        transcriber = FakeTranscriber()
+        with patch('builtins.print'):
+            assert build_corpus(corpus, transcriber) == 3
+
+        assert len(transcriber.fetched) == 3
+        assert (corpus / "sample_1.wav").read_bytes() == b"existing"
+        assert [a.name for a, _ in find_corpus(corpus)] == [f"sample_{i}.wav" for i in range(1, 5)]
+
+    def test_summarize(self):
+        """Test real-time factor and similarity in the report row"""
+        raw = {
+            'backend': "fake:none",
+            'load_seconds': 1.234,
+            'transcribe_seconds': {'a.wav': 5.0, 'b.wav': 5.0},
+            'outputs': {'a.wav': "olá mundo", 'b.wav': "bom dia"},
+            'peak_rss_mb': 512.0,
+        }
+        row = summarize(raw, {'a.wav': 20.0, 'b.wav': 20.0},
+                        {'a.wav': "Olá, mundo.", 'b.wav': "bom dia"})
+
+        assert row['rtf'] == 0.25
+        assert row['similarity'] == 100.0
+        assert row['wer'] == 0.0
+        assert row['load_seconds'] == 1.23
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
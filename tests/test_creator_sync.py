@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test suite for incremental creator sync
+"""
+
+import pytest
+import os
+import json
+import tempfile
+import shutil
+from pathlib import Path
+from unittest.mock import MagicMock
+import sys
+
+# Add the parent directory to the path so we can import creator_sync
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from creator_sync import CreatorStateStore, sync_creator
+from url_utils import extract_shortcode
+
+
+class TestExtractShortcode:
+    """Test cases for shortcode extraction"""
+
+    def test_reel_and_post_urls(self):
+        """Test that reel and post URLs both yield their shortcode"""
+        assert extract_shortcode("https://www.instagram.com/reel/DOETVeCjLp4/?igsh=x") == "DOETVeCjLp4"
+        assert extract_shortcode("https://instagram.com/p/ABC123") == "ABC123"
+
+    def test_unknown_url(self):
+        """Test that URLs without a shortcode return None"""
+        assert extract_shortcode("https://www.instagram.com/invalid/url") is None
+
+
+class TestCreatorSync:
+    """Test cases for the per-creator state store and sync"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcriber = MagicMock()
+        self.transcriber.output_dir = Path(self.temp_dir)
+        self.transcriber.transcribe_video_direct.side_effect = lambda url: f"text {url}"
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_second_sync_only_processes_new_reels(self):
+        """Test that a weekly re-run only transcribes reels added since the last run"""
+        week_1 = [f"https://www.instagram.com/reel/R{i}/" for i in range(1, 4)]
+        week_2 = week_1 + ["https://www.instagram.com/reel/R4/"]
+
+        first = sync_creator(self.transcriber, "creator", week_1)
+        second = sync_creator(self.transcriber, "creator", week_2)
+
+        assert first['transcribed'] == 3
+        assert second['new'] == 1
+        assert self.transcriber.transcribe_video_direct.call_count == 4
+
+        corpus = second['corpus'].read_text(encoding='utf-8')
+        assert corpus.count("URL: ") == 4
+        assert "text https://www.instagram.com/reel/R4/" in corpus
+
+    def test_failed_reels_are_retried(self):
+        """Test that a failed transcription is not recorded in the state"""
+        urls = ["https://www.instagram.com/reel/BAD/"]
+        self.transcriber.transcribe_video_direct.side_effect = [None, "recovered"]
+
+        assert sync_creator(self.transcriber, "creator", urls)['failed'] == 1
+        assert sync_creator(self.transcriber, "creator", urls)['transcribed'] == 1
+
+    def test_state_records_corpus_offset(self):
+        """Test that each shortcode points at its entry in the corpus"""
+        store = CreatorStateStore(self.temp_dir, "@creator")
+        store.append("A1", "https://www.instagram.com/reel/A1/", "primeira transcrição")
+        store.append("B2", "https://www.instagram.com/reel/B2/", "second")
+
+        offset = CreatorStateStore(self.temp_dir, "creator").items['B2']['offset']
+        with open(store.corpus_path, 'rb') as f:
+            f.seek(offset)
+            assert f.readline().decode('utf-8').strip() == "URL: https://www.instagram.com/reel/B2/"
+
+    def test_state_is_append_only(self):
+        """Test that recording a reel appends one line instead of rewriting the state"""
+        store = CreatorStateStore(self.temp_dir, "creator")
+        store.append("A1", "https://www.instagram.com/reel/A1/", "first")
+        first_line = store.state_path.read_text(encoding='utf-8')
+        store.append("B2", "https://www.instagram.com/reel/B2/", "second")
+
+        lines = store.state_path.read_text(encoding='utf-8').splitlines()
+        assert lines[0] + "\n" == first_line
+        assert [json.loads(line)['shortcode'] for line in lines] == ["A1", "B2"]
+
+    def test_truncated_state_line_is_ignored(self):
+        """Test that a partial line from an interrupted run only drops that reel"""
+        store = CreatorStateStore(self.temp_dir, "creator")
+        store.append("A1", "https://www.instagram.com/reel/A1/", "first")
+        with open(store.state_path, 'a', encoding='utf-8') as f:
+            f.write('{"shortcode": "B2", "url"')
+
+        reloaded = CreatorStateStore(self.temp_dir, "creator")
+        assert "A1" in reloaded
+        assert "B2" not in reloaded
+
+    def test_legacy_state_file_is_read(self):
+        """Test that shortcodes from a state.json written by older versions are kept"""
+        creator_dir = Path(self.temp_dir) / "creators" / "creator"
+        creator_dir.mkdir(parents=True)
+        (creator_dir / "state.json").write_text(json.dumps(
+            {'username': "creator", 'items': {"OLD1": {'url': "https://www.instagram.com/reel/OLD1/"}}}),
+            encoding='utf-8')
+
+        store = CreatorStateStore(self.temp_dir, "creator")
+        assert "OLD1" in store
+        assert store.new_items(["https://www.instagram.com/reel/OLD1/"]) == []
+
+    def test_duplicate_urls_in_list(self):
+        """Test that the same reel listed twice is only transcribed once"""
+        store = CreatorStateStore(self.temp_dir, "creator")
+        urls = [
+            "https://www.instagram.com/reel/X/",
+            "https://www.instagram.com/reel/X/?utm_source=ig",
+        ]
+        assert store.new_items(urls) == [("X", urls[0])]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
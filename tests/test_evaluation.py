@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test suite for the WER/CER evaluation engine
+"""
+
+import pytest
+import os
+import random
+import tempfile
+import shutil
+from pathlib import Path
+import sys
+
+# Add the parent directory to the path so we can import evaluation
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluation import (character_error_rate, clean_text, edit_distance, evaluate_pairs,
+                        load_pairs, read_transcript, word_error_rate)
+
+
+def reference_distance(a, b):
+    """Textbook dynamic-programming Levenshtein distance"""
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y)))
+        previous = current
+    return previous[-1]
+
+
+class TestEditDistance:
+    """Test cases for the bit-parallel edit distance"""
+
+    def test_known_distances(self):
+        """Test classic examples and empty inputs"""
+        assert edit_distance("kitten", "sitting") == 3
+        assert edit_distance("", "abc") == 3
+        assert edit_distance("abc", "") == 3
+        assert edit_distance(["a", "casa"], ["a", "casa"]) == 0
+
+    def test_matches_dynamic_programming(self):
+        """Test against the DP definition on random strings and word lists"""
+        rng = random.Random(7)
+        for _ in range(500):
+            a = [rng.choice("abcde") for _ in range(rng.randint(0, 70))]
+            b = [rng.choice("abcdef") for _ in range(rng.randint(0, 70))]
+            assert edit_distance(a, b) == reference_distance(a, b)
+
+    def test_long_transcript(self):
+        """Test that transcripts far beyond a machine word are handled"""
+        text = Path(__file__).parent.joinpath("test_data", "sample_1.txt").read_text(encoding='utf-8')
+        edited = text.replace("site", "sítio", 3)
+        assert edit_distance(text, edited) == 3 * 3
+
+
+class TestErrorRates:
+    """Test cases for WER, CER and the evaluation report"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_normalization_is_shared(self):
+        """Test that punctuation and case differences are not errors"""
+        assert clean_text("  Olá,   Mundo! ") == "olá mundo"
+        assert word_error_rate("Olá, mundo.", "olá mundo") == 0.0
+
+    def test_word_and_character_error_rates(self):
+        """Test WER and CER on a substitution"""
+        assert word_error_rate("a casa azul", "a casa verde") == pytest.approx(1 / 3)
+        assert character_error_rate("abcd", "abed") == 0.25
+
+    def test_aggregate_is_corpus_level(self):
+        """Test that the corpus WER weights samples by reference length"""
+        pairs = [
+            ("short", "um dois", "um três"),
+            ("long", "um dois três quatro cinco seis sete oito", "um dois três quatro cinco seis sete oito"),
+        ]
+        samples, summary = evaluate_pairs(pairs)
+
+        assert [s['id'] for s in samples] == ["short", "long"]
+        assert summary['wer'] == pytest.approx(1 / 10)
+        assert summary['mean_wer'] == pytest.approx(0.25)
+
+    def test_parallel_matches_serial(self):
+        """Test that the process pool gives the same scores in the same order"""
+        pairs = [(str(i), "a b c d e f", "a b x d " * (i % 3)) for i in range(40)]
+        assert evaluate_pairs(pairs, workers=2) == evaluate_pairs(pairs, workers=1)
+
+    def test_load_pairs_strips_headers(self):
+        """Test offline scoring of stored reference and hypothesis files"""
+        refs = Path(self.temp_dir, "refs")
+        hyps = Path(self.temp_dir, "hyps")
+        refs.mkdir()
+        hyps.mkdir()
+        (refs / "sample_1.txt").write_text("Video URL: https://x\n\nOlá mundo", encoding='utf-8')
+        (hyps / "sample_1.txt").write_text(
+            "Instagram Video Transcription\nURL: https://x\n" + "=" * 50 + "\n\nOlá mundo",
+            encoding='utf-8')
+        (hyps / "unmatched.txt").write_text("ignored", encoding='utf-8')
+
+        assert load_pairs(refs, hyps) == [("sample_1", "Olá mundo", "Olá mundo")]
+        assert read_transcript(hyps / "sample_1.txt") == "Olá mundo"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test suite for the decoded-audio media cache
+"""
+
+import pytest
+import os
+import time
+import tempfile
+import shutil
+from unittest.mock import patch
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub.generators import Sine
+
+from main import InstagramTranscriber
+from media_cache import SAMPLE_RATE, MediaCache, to_float32
+from tests.test_backends import FakeBackend
+
+
+def make_audio(seconds=1.0):
+    """Stereo 44.1 kHz tone, like a decoded reel soundtrack"""
+    return Sine(440, sample_rate=44100).to_audio_segment(duration=seconds * 1000).set_channels(2)
+
+
+class TestMediaCache:
+    """Test cases for MediaCache storage and eviction"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_put_stores_16khz_mono(self):
+        """Test that cached audio is resampled to 16 kHz mono and memory-mapped"""
+        cache = MediaCache(self.temp_dir)
+        samples = cache.put("ABC", make_audio(1.0))
+
+        assert isinstance(samples, np.memmap)
+        assert samples.dtype == np.int16
+        assert abs(len(samples) - SAMPLE_RATE) <= 1
+        assert cache.path_for("ABC").stat().st_size == len(samples) * 2
+
+    def test_float32_cache_is_not_copied(self):
+        """Test that float32 entries go to inference without conversion"""
+        cache = MediaCache(self.temp_dir, dtype='float32')
+        samples = cache.put("ABC", make_audio(0.5))
+
+        assert to_float32(samples) is samples
+        assert np.abs(samples).max() <= 1.0
+
+    def test_int16_conversion(self):
+        """Test int16 scaling into [-1, 1)"""
+        converted = to_float32(np.array([-32768, 0, 16384], dtype=np.int16))
+        assert converted.dtype == np.float32
+        assert converted.tolist() == [-1.0, 0.0, 0.5]
+
+    def test_miss_returns_none(self):
+        """Test that an unknown shortcode is a cache miss"""
+        assert MediaCache(self.temp_dir).get("missing") is None
+
+    def test_lru_eviction_by_total_bytes(self):
+        """Test that the least recently used entries are evicted first"""
+        entry_bytes = SAMPLE_RATE * 2
+        cache = MediaCache(self.temp_dir, max_bytes=int(entry_bytes * 2.5))
+
+        cache.put("old", make_audio(1.0))
+        cache.put("used", make_audio(1.0))
+        past = time.time() - 100
+        os.utime(cache.path_for("old"), (past, past))
+        os.utime(cache.path_for("used"), (past + 1, past + 1))
+        cache.get("used")
+        cache.put("new", make_audio(1.0))
+
+        assert cache.get("old") is None
+        assert cache.get("used") is not None
+        assert cache.get("new") is not None
+        assert cache.total_bytes() <= cache.max_bytes
+
+
+class TestTranscriberMediaCache:
+    """Test cases for reusing cached audio in the transcriber"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = MediaCache(os.path.join(self.temp_dir, "cache"))
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend(),
+                                                media_cache=self.cache)
+        self.url = "https://www.instagram.com/reel/CACHED1/"
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_second_run_skips_download_and_decode(self):
+        """Test that a cache hit needs no network and no ffmpeg"""
+        with patch.object(self.transcriber, 'download_video', return_value="/tmp/none.mp4") as download, \
+             patch.object(self.transcriber, 'extract_audio', return_value=make_audio()) as extract:
+            assert self.transcriber.transcribe_video_direct(self.url)
+            assert self.transcriber.transcribe_video_direct(self.url)
+
+        assert download.call_count == 1
+        assert extract.call_count == 1
+        assert isinstance(self.transcriber.backend.received, np.ndarray)
+        assert self.transcriber.backend.received.dtype == np.float32
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
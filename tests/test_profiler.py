@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Test suite for the sampling profiler
+"""
+
+import os
+import json
+import tempfile
+import shutil
+import threading
+import time
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+import main
+from main import InstagramTranscriber
+from profiler import ROOT_STAGE, SamplingProfiler
+from tests.test_backends import FakeBackend
+
+
+def busy_loop(seconds):
+    """Burn CPU in a recognisable function"""
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        sum(range(100))
+
+
+class SlowBackend(FakeBackend):
+    """FakeBackend that spends time in busy_loop before each segment"""
+
+    def transcribe(self, audio, language="pt"):
+        for segment in super().transcribe(audio, language):
+            busy_loop(0.05)
+            yield segment
+
+
+class TestSamplingProfiler:
+    """Test cases for sampling and tagging"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiler = SamplingProfiler(interval=0.001)
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_stage_tags_inherit_video(self):
+        """Test that nested stages keep the enclosing video index"""
+        assert self.profiler.current_tag() == (ROOT_STAGE, None)
+        with self.profiler.stage(video=4):
+            with self.profiler.stage('decode'):
+                assert self.profiler.current_tag() == ('decode', 4)
+            assert self.profiler.current_tag() == (ROOT_STAGE, 4)
+        assert self.profiler.current_tag() == (ROOT_STAGE, None)
+
+    def test_samples_are_tagged(self):
+        """Test that samples land under the active stage and video"""
+        with self.profiler.stage('transcribe', video=2):
+            self.profiler.sample()
+        self.profiler.sample()
+
+        stages = {(stage, video) for stage, video, _ in self.profiler.samples}
+        assert stages == {('transcribe', 2), (ROOT_STAGE, None)}
+        stack = next(stack for stage, _, stack in self.profiler.samples if stage == 'transcribe')
+        assert stack[-1].startswith("sample (profiler.py:")
+        assert any(label.startswith("test_samples_are_tagged (tests/test_profiler.py:")
+                   or label.startswith("test_samples_are_tagged (test_profiler.py:") for label in stack)
+
+    def test_bind_carries_tag_to_worker_thread(self):
+        """Test that work handed to another thread keeps the caller's tag"""
+        with self.profiler.stage('download', video=7):
+            fn = self.profiler.bind(self.profiler.current_tag)
+        result = []
+        thread = threading.Thread(target=lambda: result.append(fn()))
+        thread.start()
+        thread.join()
+        assert result == [('download', 7)]
+
+    def test_background_sampling_and_idle_filter(self):
+        """Test that the sampler finds busy work and skips threads waiting on a join"""
+        self.profiler.start()
+        with self.profiler.stage('decode', video=1):
+            worker = threading.Thread(target=self.profiler.bind(lambda: busy_loop(0.2)))
+            worker.start()
+            worker.join()
+        self.profiler.stop()
+
+        hot = self.profiler.hot_functions()
+        assert self.profiler.sample_count > 0
+        assert any(label.startswith("busy_loop") for label, _ in hot['decode']['total'])
+        joins = [stack for stage, _, stack in self.profiler.samples if stack[-1].startswith("join ")]
+        assert joins == []
+
+    def test_sampling_races_with_stage_changes(self):
+        """Test that tags changing under the sampler never break a sample"""
+        stop = threading.Event()
+
+        def churn():
+            while not stop.is_set():
+                with self.profiler.stage('decode', video=1):
+                    with self.profiler.stage('transcribe'):
+                        pass
+
+        thread = threading.Thread(target=churn)
+        thread.start()
+        try:
+            for _ in range(2000):
+                self.profiler.sample()
+        finally:
+            stop.set()
+            thread.join()
+        assert self.profiler.sample_count > 0
+        assert self.profiler.errors == 0
+
+    def test_outputs(self):
+        """Test the collapsed, speedscope and summary files"""
+        with self.profiler.stage('transcribe', video=3):
+            for _ in range(3):
+                self.profiler.sample()
+        with self.profiler.stage('download', video=3):
+            self.profiler.sample()
+
+        with patch('builtins.print'):
+            paths = self.profiler.save(os.path.join(self.temp_dir, "run", "profile"))
+
+        lines = open(paths[0], encoding='utf-8').read().splitlines()
+        assert lines[-1].startswith("transcribe;video 3;")
+        assert lines[-1].endswith(" 3")
+
+        speedscope = json.load(open(paths[1], encoding='utf-8'))
+        assert [p['name'] for p in speedscope['profiles']] == ["profile: transcribe", "profile: download"]
+        profile = speedscope['profiles'][0]
+        assert profile['type'] == 'sampled'
+        assert len(profile['samples']) == len(profile['weights'])
+        assert speedscope['shared']['frames'][profile['samples'][0][0]]['name'] == "video 3"
+
+        summary = open(paths[2], encoding='utf-8').read()
+        assert "[transcribe] 3 samples (75.0%)" in summary
+        assert "[download] 1 samples (25.0%)" in summary
+
+
+class TestTranscriberProfiling:
+    """Test cases for stage instrumentation in InstagramTranscriber"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.profiler = SamplingProfiler(interval=0.002)
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=SlowBackend(),
+                                                profiler=self.profiler)
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_batch_samples_tagged_by_stage_and_video(self):
+        """Test that download, decode and transcribe work is attributed per video"""
+        def slow_download(url, cancelled=None):
+            busy_loop(0.05)
+            return os.path.join(self.temp_dir, "video.mp4")
+
+        def slow_decode(stage, timeout, args):
+            busy_loop(0.05)
+            return AudioSegment.silent(duration=500, frame_rate=16000).raw_data
+
+        urls = ["https://www.instagram.com/reel/PROF1/", "https://www.instagram.com/reel/PROF2/"]
+        with patch.object(self.transcriber, '_download_once', side_effect=slow_download), \
+                patch('main.run_process', side_effect=slow_decode):
+            self.profiler.start()
+            self.transcriber.transcribe_selected_videos(urls, [1, 2])
+            self.profiler.stop()
+
+        tags = {(stage, video) for stage, video, _ in self.profiler.samples}
+        for video in (1, 2):
+            for stage in ('download', 'decode', 'transcribe'):
+                assert (stage, video) in tags
+
+    def test_no_profiler_is_a_no_op(self):
+        """Test that stage tagging works without a profiler"""
+        transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend())
+        with transcriber.profile_stage('download', video=1):
+            pass
+        assert transcriber._profiled('decode', len) is len
+
+
+class TestProfileOption:
+    """Test cases for the --profile command line options"""
+
+    def run_main(self, argv):
+        captured = {}
+
+        def fake_run_command(parser, args, index_path, stage_options):
+            captured['args'] = args
+            captured['profiler'] = stage_options.get('profiler')
+
+        with patch.object(sys, 'argv', ['main.py'] + argv), \
+                patch('main.run_command', side_effect=fake_run_command), \
+                patch.object(SamplingProfiler, 'save') as save:
+            main.main()
+        return captured, save
+
+    def test_profile_flag_keeps_positional_url(self):
+        """Test that --profile does not swallow the URL"""
+        url = "https://www.instagram.com/reel/ABC/"
+        captured, save = self.run_main(['--profile', url])
+        assert captured['args'].url == url
+        assert captured['profiler'] is not None
+        assert save.call_args[0][0].startswith(os.path.join("transcriptions", "profile_"))
+
+    def test_profile_prefix(self):
+        """Test that --profile-prefix sets the output prefix"""
+        captured, save = self.run_main(['--profile-prefix', 'profiles/run',
+                                        'https://www.instagram.com/reel/ABC/'])
+        assert captured['profiler'] is not None
+        save.assert_called_once_with('profiles/run')
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test suite for stage timeouts, retries and the circuit breaker
+"""
+
+import pytest
+import os
+import time
+import tempfile
+import shutil
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from main import InstagramTranscriber
+from resilience import (CircuitBreaker, RetryPolicy, StageTimeout, is_permanent_error,
+                        is_rate_limited, run_process, run_with_timeout)
+
+
+class FakeClock:
+    """Manually advanced clock for circuit breaker tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestResiliencePrimitives:
+    """Test cases for the resilience helpers"""
+
+    def test_run_with_timeout(self):
+        """Test that a slow call raises StageTimeout and a fast one returns"""
+        assert run_with_timeout('decode', 1, lambda x: x * 2, 21) == 42
+        with pytest.raises(StageTimeout) as error:
+            run_with_timeout('download', 0.05, time.sleep, 1)
+        assert error.value.stage == 'download'
+        assert str(error.value) == "timeout after 0.05s"
+
+    def test_run_with_timeout_propagates_errors(self):
+        """Test that exceptions from the stage reach the caller"""
+        def broken():
+            raise ValueError("bad input")
+        with pytest.raises(ValueError):
+            run_with_timeout('decode', 1, broken)
+
+    def test_run_process_kills_on_timeout(self):
+        """Test that a subprocess past its deadline is killed, not abandoned"""
+        start = time.monotonic()
+        with pytest.raises(StageTimeout):
+            run_process('decode', 0.2, [sys.executable, '-c', 'import time; time.sleep(30)'])
+        assert time.monotonic() - start < 5
+
+    def test_run_process_errors(self):
+        """Test that a failing subprocess reports its last stderr line"""
+        assert run_process('decode', 5, [sys.executable, '-c', 'print("ok")']).strip() == b"ok"
+        with pytest.raises(RuntimeError, match="boom"):
+            run_process('decode', 5, [sys.executable, '-c', 'import sys; sys.exit("boom")'])
+
+    def test_retry_delays_back_off(self):
+        """Test exponential backoff capped at max_delay"""
+        policy = RetryPolicy(base_delay=1, max_delay=5, multiplier=2, jitter=0)
+        assert [policy.delay(n) for n in range(1, 5)] == [1, 2, 4, 5]
+
+    def test_error_classification(self):
+        """Test rate-limit and permanent error detection"""
+        rate_limited = ("ERROR: [Instagram] X: Requested content is not available, "
+                        "rate-limit reached or login required")
+        assert is_rate_limited(rate_limited)
+        assert is_rate_limited("HTTP Error 429: Too Many Requests")
+        assert not is_permanent_error(rate_limited)
+        assert is_permanent_error("ERROR: This account is private")
+        assert not is_permanent_error("Connection reset by peer")
+
+    def test_circuit_breaker_pauses_after_threshold(self):
+        """Test that the breaker opens after repeated rate limits and waits out the cooldown"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=60, clock=clock, sleep=clock.sleep)
+
+        breaker.record_rate_limit()
+        assert not breaker.is_open
+        assert breaker.wait_if_open() == 0.0
+
+        breaker.record_rate_limit()
+        assert breaker.is_open
+        assert breaker.wait_if_open() == 60
+        assert clock.now == 60
+
+        breaker.record_success()
+        assert not breaker.is_open
+
+
+class TestTranscriberFailureIsolation:
+    """Test cases for retries and failure reasons in the transcriber"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcriber = InstagramTranscriber(
+            output_dir=self.temp_dir, load_model=False,
+            timeouts={'download': 0.2},
+            retry_policy=RetryPolicy(max_attempts=3, base_delay=0, jitter=0),
+        )
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_download_retries_transient_errors(self):
+        """Test that a transient download error is retried"""
+        with patch.object(self.transcriber, '_download_once',
+                          side_effect=[OSError("Connection reset"), "/tmp/video.mp4"]) as download:
+            assert self.transcriber.download_video("https://www.instagram.com/reel/A/") == "/tmp/video.mp4"
+        assert download.call_count == 2
+
+    def test_hung_download_times_out(self):
+        """Test that a hung download gives up with a timeout reason"""
+        with patch.object(self.transcriber, '_download_once', side_effect=lambda url, cancelled: time.sleep(5)):
+            assert self.transcriber.transcribe_video_direct("https://www.instagram.com/reel/HUNG/") is None
+
+        stage, reason = self.transcriber.failures["https://www.instagram.com/reel/HUNG/"]
+        assert stage == 'download'
+        assert reason == "timeout after 0.2s after 3 attempts"
+
+    def test_failed_download_removes_temp_dir(self):
+        """Test that a failed or cancelled attempt leaves no temporary directory"""
+        attempt_dir = os.path.join(self.temp_dir, "attempt")
+        os.mkdir(attempt_dir)
+        with patch('main.tempfile.mkdtemp', return_value=attempt_dir), \
+                patch('main.yt_dlp.YoutubeDL') as ydl:
+            ydl.return_value.__enter__.return_value.extract_info.side_effect = OSError("reset")
+            with pytest.raises(OSError):
+                self.transcriber._download_once("https://www.instagram.com/reel/T/")
+        assert not os.path.exists(attempt_dir)
+
+    def test_timed_out_download_is_cancelled(self):
+        """Test that a timed-out attempt is told to stop before the retry starts"""
+        events = []
+
+        def hang(url, cancelled):
+            events.append(cancelled)
+            cancelled.wait(5)
+
+        with patch.object(self.transcriber, '_download_once', side_effect=hang):
+            assert self.transcriber.download_video("https://www.instagram.com/reel/C/") is None
+        assert len(events) == 3
+        assert all(event.is_set() for event in events)
+
+    def test_permanent_error_is_not_retried(self):
+        """Test that a private reel fails on the first attempt"""
+        with patch.object(self.transcriber, '_download_once',
+                          side_effect=Exception("This account is private")) as download:
+            assert self.transcriber.download_video("https://www.instagram.com/reel/P/") is None
+        assert download.call_count == 1
+
+    def test_batch_output_reports_failure_reason(self):
+        """Test that a failed video gets a structured reason in the batch file"""
+        urls = ["https://www.instagram.com/reel/GOOD/", "https://www.instagram.com/reel/BAD/"]
+
+        def fake_direct(url):
+            if url.endswith("BAD/"):
+                self.transcriber.failures[url] = ('decode', "invalid data found")
+                return None
+            return "texto do vídeo"
+
+        with patch.object(self.transcriber, 'transcribe_video_direct', side_effect=fake_direct):
+            output_file = self.transcriber.transcribe_selected_videos(urls, [1, 2])
+
+        content = output_file.read_text(encoding='utf-8')
+        assert "texto do vídeo" in content
+        assert "[Video 2: Transcription failed - decode: invalid data found]" in content
+
+
+class TestTimeoutOptions:
+    """Test cases for the per-stage timeout command line options"""
+
+    def test_every_stage_has_a_timeout_option(self):
+        """Test that download, decode and transcribe deadlines all reach the transcriber"""
+        captured = {}
+
+        def fake_run_command(parser, args, index_path, stage_options):
+            captured.update(stage_options['timeouts'])
+
+        argv = ['main.py', '--download-timeout', '10', '--decode-timeout', '20',
+                '--transcribe-timeout', '30', 'https://www.instagram.com/reel/ABC/']
+        with patch.object(sys, 'argv', argv), \
+                patch('main.run_command', side_effect=fake_run_command):
+            main.main()
+        assert captured == {'download': 10, 'decode': 20, 'transcribe': 30}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test suite for streaming segment output
+"""
+
+import pytest
+import os
+import asyncio
+import tempfile
+import shutil
+from unittest.mock import patch
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+from main import InstagramTranscriber
+from tests.test_backends import FakeBackend
+
+
+class TestStreaming:
+    """Test cases for segment streaming APIs"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcriber = InstagramTranscriber(output_dir=self.temp_dir, backend=FakeBackend())
+        self.url = "https://www.instagram.com/reel/STREAM1/"
+        self.load_audio = patch.object(self.transcriber, 'load_audio',
+                                       return_value=AudioSegment.silent(duration=500))
+        self.load_audio.start()
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        self.load_audio.stop()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_stream_video_yields_segments(self):
+        """Test that segments are yielded one at a time with a first-text metric"""
+        stream = self.transcriber.stream_video(self.url)
+
+        first = next(stream)
+        assert first['text'] == ' Olá'
+        assert 'time_to_first_text' in self.transcriber.last_metrics
+        assert 'total' not in self.transcriber.last_metrics
+
+        assert [segment['text'] for segment in stream] == [' mundo']
+        assert self.transcriber.last_metrics['total'] >= \
+            self.transcriber.last_metrics['time_to_first_text']
+
+    def test_async_stream(self):
+        """Test the async iterator API"""
+        async def collect():
+            return [segment['text'] async for segment in self.transcriber.astream_video(self.url)]
+
+        assert asyncio.run(collect()) == [' Olá', ' mundo']
+
+    def test_async_stream_propagates_errors(self):
+        """Test that stream errors reach the async consumer"""
+        async def collect():
+            return [segment async for segment in self.transcriber.astream_video("not_a_url")]
+
+        with pytest.raises(ValueError):
+            asyncio.run(collect())
+
+    def test_streaming_file_matches_saved_format(self):
+        """Test that the streamed file has the same layout as save_transcription"""
+        streamed = self.transcriber.transcribe_video_streaming(self.url)
+        content = streamed.read_text(encoding='utf-8')
+
+        assert content.startswith("Instagram Video Transcription\nURL: " + self.url)
+        assert content.endswith("=" * 50 + "\n\nOlá mundo")
+
+    def test_file_is_written_before_stream_ends(self):
+        """Test that each segment is flushed to disk as soon as it is decoded"""
+        seen = []
+        original = self.transcriber.stream_video
+
+        def spy(url):
+            for segment in original(url):
+                yield segment
+                path = next(p for p in os.listdir(self.temp_dir) if p.endswith('.txt'))
+                with open(os.path.join(self.temp_dir, path), encoding='utf-8') as f:
+                    seen.append(f.read().rsplit("\n", 1)[-1])
+
+        with patch.object(self.transcriber, 'stream_video', side_effect=spy):
+            self.transcriber.transcribe_video_streaming(self.url)
+
+        assert seen == ["Olá", "Olá mundo"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test suite for the transcript full-text index
+"""
+
+import pytest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+import sys
+
+# Add the parent directory to the path so we can import main
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import InstagramTranscriber
+from transcript_index import TranscriptIndex, build_match_query, format_ms
+
+
+class TestTranscriptIndex:
+    """Test cases for indexing and searching transcripts"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.temp_dir, "transcripts.db")
+        self.transcriber = InstagramTranscriber(
+            output_dir=self.temp_dir, load_model=False, index_path=self.index_path
+        )
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_save_transcription_is_indexed_with_timings(self):
+        """Test that saving a single transcription adds its segments to the index"""
+        url = "https://www.instagram.com/reel/ABC123/"
+        segments = [
+            {'start': 0.0, 'end': 2.5, 'text': ' Bem-vindos ao canal'},
+            {'start': 2.5, 'end': 4.25, 'text': ' impermeabilização da laje'},
+        ]
+        self.transcriber.save_transcription("Bem-vindos ao canal impermeabilização da laje",
+                                            url, segments)
+
+        hits = self.transcriber.index.search("impermeabilizacao")
+
+        assert len(hits) == 1
+        assert hits[0]['shortcode'] == "ABC123"
+        assert hits[0]['url'] == url
+        assert (hits[0]['start_ms'], hits[0]['end_ms']) == (2500, 4250)
+
+    def test_batch_transcription_is_indexed_per_video(self):
+        """Test that each video in a batch file becomes its own search result"""
+        urls = ["https://www.instagram.com/reel/ONE/", "https://www.instagram.com/reel/TWO/"]
+        self.transcriber.save_batch_transcription(
+            ["primeiro vídeo sobre telhado", "", "segundo vídeo sobre telhado"],
+            [1, 2, 3], [urls[0], "https://www.instagram.com/reel/FAIL/", urls[1]],
+        )
+
+        hits = self.transcriber.index.search("telhado")
+
+        assert sorted(hit['shortcode'] for hit in hits) == ["ONE", "TWO"]
+        assert sorted(hit['video_index'] for hit in hits) == [1, 3]
+
+    def test_bulk_index_existing_directory(self):
+        """Test that existing output files are indexed once and only once"""
+        output_dir = Path(self.temp_dir) / "old_output"
+        plain = InstagramTranscriber(output_dir=output_dir, load_model=False)
+        plain.save_transcription("concreto armado", "https://www.instagram.com/reel/OLD1/")
+        plain.save_batch_transcription(["fundação rasa", ""], [4, 7])
+
+        index = TranscriptIndex(self.index_path)
+        assert index.index_directory(output_dir) == 2
+        assert index.index_directory(output_dir) == 0
+
+        assert index.search("concreto")[0]['shortcode'] == "OLD1"
+        batch_hit = index.search("fundacao")[0]
+        assert batch_hit['url'] is None
+        assert batch_hit['video_index'] == 4
+
+    def test_same_file_under_another_spelling(self):
+        """Test that relative and absolute spellings of a file are indexed once"""
+        output_dir = Path(self.temp_dir) / "old_output"
+        plain = InstagramTranscriber(output_dir=output_dir, load_model=False)
+        plain.save_transcription("viga baldrame", "https://www.instagram.com/reel/SAME1/")
+
+        index = TranscriptIndex(self.index_path)
+        assert index.index_directory(output_dir) == 1
+        cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            assert index.index_directory("./old_output") == 0
+            assert index.index_directory("old_output/../old_output") == 0
+        finally:
+            os.chdir(cwd)
+        assert len(index.search("baldrame")) == 1
+
+    def test_query_syntax_is_escaped(self):
+        """Test that user punctuation cannot break the FTS5 query"""
+        assert build_match_query('laje "OR" NOT-a*') == '"laje" "OR" "NOT-a"*'
+        assert self.transcriber.index.search('"') == []
+
+    def test_format_ms(self):
+        """Test human-readable timestamps in search output"""
+        assert format_ms(61005) == "1:01.005"
+        assert format_ms(None) == "--:--"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Test suite for the distributed batch work-queue
+"""
+
+import pytest
+import os
+import time
+import tempfile
+import shutil
+import multiprocessing
+from pathlib import Path
+import sqlite3
+from unittest.mock import MagicMock, patch
+import sys
+
+# Add the parent directory to the path so we can import work_queue
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from work_queue import WorkQueue, LeaseHeartbeat, run_worker, merge_results
+
+
+URLS = [f"https://www.instagram.com/reel/VIDEO{i}/" for i in range(1, 13)]
+
+
+def fake_transcribe(url):
+    """Stand-in for transcribe_video_direct that fails for one video."""
+    if url.endswith("VIDEO5/"):
+        return None
+    time.sleep(0.01)
+    return f"text for {url}"
+
+
+def worker_process(db_path, worker_id):
+    """Entry point for a local worker process."""
+    queue = WorkQueue(db_path, lease_seconds=5)
+    run_worker(queue, fake_transcribe, worker_id=worker_id, poll_interval=0.05)
+
+
+class TestWorkQueue:
+    """Test cases for WorkQueue leasing"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "queue.sqlite")
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_enqueue_is_idempotent(self):
+        """Test that re-running the coordinator does not duplicate items"""
+        queue = WorkQueue(self.db_path)
+        assert queue.enqueue(URLS, [1, 2, 3]) == 3
+        assert queue.enqueue(URLS, [2, 3, 4]) == 1
+        assert queue.counts()['pending'] == 4
+
+    def test_lease_hands_out_each_item_once(self):
+        """Test that two workers never receive the same item"""
+        queue = WorkQueue(self.db_path)
+        queue.enqueue(URLS, [1, 2])
+
+        first = queue.lease("a")
+        second = queue.lease("b")
+
+        assert first['video_index'] == 1
+        assert second['video_index'] == 2
+        assert queue.lease("c") is None
+
+    def test_expired_lease_is_requeued(self):
+        """Test that an item is handed out again when its worker stops heartbeating"""
+        queue = WorkQueue(self.db_path, lease_seconds=0.05)
+        queue.enqueue(URLS, [1])
+
+        item = queue.lease("dead-worker")
+        time.sleep(0.1)
+        retry = queue.lease("live-worker")
+
+        assert retry['id'] == item['id']
+        assert retry['attempts'] == 2
+        assert not queue.complete(item['id'], "dead-worker", "stale")
+        assert queue.complete(retry['id'], "live-worker", "fresh")
+
+    def test_heartbeat_keeps_lease(self):
+        """Test that heartbeats stop the lease from expiring"""
+        queue = WorkQueue(self.db_path, lease_seconds=0.2)
+        queue.enqueue(URLS, [1])
+
+        item = queue.lease("worker")
+        for _ in range(4):
+            time.sleep(0.08)
+            assert queue.heartbeat(item['id'], "worker")
+
+        assert queue.lease("other") is None
+
+    def test_heartbeat_survives_locked_database(self):
+        """Test that a failed heartbeat is retried instead of killing the thread"""
+        queue = WorkQueue(self.db_path, lease_seconds=0.3)
+        queue.enqueue(URLS, [1])
+        item = queue.lease("worker")
+
+        real_heartbeat = queue.heartbeat
+        calls = []
+
+        def flaky_heartbeat(item_id, worker_id):
+            calls.append(item_id)
+            if len(calls) <= 2:
+                raise sqlite3.OperationalError("database is locked")
+            return real_heartbeat(item_id, worker_id)
+
+        with patch.object(queue, 'heartbeat', side_effect=flaky_heartbeat), \
+                patch('builtins.print'):
+            with LeaseHeartbeat(queue, item['id'], "worker", interval=0.05) as heartbeat:
+                time.sleep(0.5)
+
+        assert len(calls) > 3
+        assert not heartbeat.lost
+        assert queue.lease("other") is None
+
+    def test_heartbeat_reports_lost_lease(self):
+        """Test that lost is only set when the lease no longer belongs to the worker"""
+        queue = WorkQueue(self.db_path)
+        queue.enqueue(URLS, [1])
+        item = queue.lease("worker")
+        queue.fail(item['id'], "worker", "gone")
+
+        with LeaseHeartbeat(queue, item['id'], "worker", interval=0.02) as heartbeat:
+            time.sleep(0.1)
+        assert heartbeat.lost
+
+    def test_enqueue_rolls_back_on_error(self):
+        """Test that a failed enqueue adds nothing and leaves no transaction open"""
+        queue = WorkQueue(self.db_path)
+        # The second url cannot be bound, so the insert fails halfway through
+        with pytest.raises(sqlite3.Error):
+            queue.enqueue([URLS[0], object()], [1, 2])
+        assert queue.counts()['pending'] == 0
+        assert queue.enqueue(URLS, [1]) == 1
+
+    def test_item_fails_after_max_attempts(self):
+        """Test that an item is not retried forever"""
+        queue = WorkQueue(self.db_path, lease_seconds=0.01, max_attempts=2)
+        queue.enqueue(URLS, [1])
+
+        queue.lease("a")
+        time.sleep(0.02)
+        queue.lease("b")
+        time.sleep(0.02)
+
+        assert queue.lease("c") is None
+        assert queue.counts()['failed'] == 1
+
+
+class TestDistributedBatch:
+    """End-to-end tests with several local worker processes"""
+
+    def setup_method(self):
+        """Set up test fixtures before each test method"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "queue.sqlite")
+
+    def teardown_method(self):
+        """Clean up after each test method"""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_multiple_workers_drain_queue(self):
+        """Test that local worker processes process every item exactly once"""
+        queue = WorkQueue(self.db_path)
+        selected = list(range(1, len(URLS) + 1))
+        queue.enqueue(URLS, selected)
+
+        workers = [
+            multiprocessing.Process(target=worker_process, args=(self.db_path, f"w{i}"))
+            for i in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+            assert worker.exitcode == 0
+
+        counts = queue.counts()
+        assert counts['done'] == len(URLS) - 1
+        assert counts['failed'] == 1
+        assert queue.remaining() == 0
+
+        results = queue.results()
+        assert [row[0] for row in results] == selected
+        assert results[4][1] == ""
+        assert results[0][1] == f"text for {URLS[0]}"
+
+    def test_merge_uses_batch_writer(self):
+        """Test that the merge step hands ordered results to save_batch_transcription"""
+        queue = WorkQueue(self.db_path)
+        queue.enqueue(URLS, [3, 1])
+        run_worker(queue, fake_transcribe, worker_id="solo", poll_interval=0.01)
+
+        transcriber = MagicMock()
+        transcriber.save_batch_transcription.return_value = Path("merged.txt")
+
+        assert merge_results(queue, transcriber) == Path("merged.txt")
+        transcriber.save_batch_transcription.assert_called_once_with(
+            [f"text for {URLS[0]}", f"text for {URLS[2]}"], [1, 3], [URLS[0], URLS[2]],
+            failures=[None, None]
+        )
+
+    def test_merge_waits_for_outstanding_items(self):
+        """Test that merge refuses to run while videos are still queued"""
+        queue = WorkQueue(self.db_path)
+        queue.enqueue(URLS, [1])
+
+        assert merge_results(queue, MagicMock()) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
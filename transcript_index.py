@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Transcript Index
+SQLite FTS5 full-text index over produced transcriptions, with segment
+timings so search hits can point at the moment in the reel they come from.
+"""
+
+import re
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+from url_utils import extract_shortcode
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    shortcode TEXT,
+    url TEXT,
+    video_index INTEGER,
+    path TEXT NOT NULL,
+    indexed TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_path ON documents (path);
+CREATE INDEX IF NOT EXISTS documents_shortcode ON documents (shortcode);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    start_ms INTEGER,
+    end_ms INTEGER,
+    text TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5 (
+    text,
+    content='segments',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+SINGLE_SEPARATOR = '=' * 50
+BATCH_SEPARATOR = '=' * 60
+FAILED_PLACEHOLDER = re.compile(r'^\[Video (\d+): Transcription failed')
+
+
+def to_ms(seconds):
+    """Convert a segment time in seconds to integer milliseconds."""
+    return None if seconds is None else int(round(seconds * 1000))
+
+
+def normalize_path(path):
+    """Absolute, symlink-free form of path, so one file is indexed under one key."""
+    return str(Path(path).resolve())
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query that matches all of its words.
+
+    Each word is quoted so punctuation in user input cannot be parsed as
+    FTS5 syntax; a trailing '*' is kept for prefix searches.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+class TranscriptIndex:
+    """Full-text index of transcripts, their source reels and segment timings."""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _insert(self, conn, url, segments, path, video_index=None):
+        cursor = conn.execute(
+            "INSERT INTO documents (shortcode, url, video_index, path, indexed) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (extract_shortcode(url) if url else None, url, video_index, normalize_path(path),
+             datetime.now().isoformat(timespec='seconds')),
+        )
+        document_id = cursor.lastrowid
+        for segment in segments:
+            text = segment['text'].strip()
+            if not text:
+                continue
+            cursor = conn.execute(
+                "INSERT INTO segments (document_id, start_ms, end_ms, text) VALUES (?, ?, ?, ?)",
+                (document_id, to_ms(segment.get('start')), to_ms(segment.get('end')), text),
+            )
+            conn.execute("INSERT INTO segments_fts (rowid, text) VALUES (?, ?)",
+                         (cursor.lastrowid, text))
+        return document_id
+
+    def add_transcript(self, url, transcription, path, segments=None, video_index=None):
+        """Index one transcript.
+
+        segments is a list of dicts with start/end in seconds and text; when
+        it is missing the whole transcription is indexed as one untimed segment.
+        """
+        if not segments:
+            segments = [{'start': None, 'end': None, 'text': transcription}]
+        with closing(self._connect()) as conn, conn:
+            return self._insert(conn, url, segments, path, video_index)
+
+    def _delete_paths(self, conn, paths):
+        removed = 0
+        # Rows indexed before paths were normalised are stored as given
+        keys = {str(path) for path in paths} | {normalize_path(path) for path in paths}
+        for path in keys:
+            for (document_id,) in conn.execute("SELECT id FROM documents WHERE path = ?",
+                                               (path,)).fetchall():
+                # External-content FTS rows are removed with the 'delete' command
+                for segment_id, text in conn.execute(
+                        "SELECT id, text FROM segments WHERE document_id = ?", (document_id,)).fetchall():
+                    conn.execute("INSERT INTO segments_fts (segments_fts, rowid, text) "
+                                 "VALUES ('delete', ?, ?)", (segment_id, text))
+                conn.execute("DELETE FROM segments WHERE document_id = ?", (document_id,))
+                conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+                removed += 1
+        return removed
+
+    def replace_documents(self, removed_paths, documents=()):
+        """Drop every document indexed under removed_paths, then index documents.
+
+        documents are (url, transcription, path, segments) tuples. Both happen
+        in one transaction, so searches never see the old and new copies at
+        once. Returns the number of documents removed.
+        """
+        with closing(self._connect()) as conn, conn:
+            removed = self._delete_paths(conn, removed_paths)
+            for url, transcription, path, segments in documents:
+                if not segments:
+                    segments = [{'start': None, 'end': None, 'text': transcription}]
+                self._insert(conn, url, segments, path)
+        return removed
+
+    def indexed_paths(self):
+        """Return the set of output files that are already in the index."""
+        with closing(self._connect()) as conn:
+            return {normalize_path(row[0]) for row in conn.execute("SELECT DISTINCT path FROM documents")}
+
+    def index_directory(self, directory):
+        """Bulk-index every transcription file in directory that is not indexed yet.
+
+        Everything is written in one transaction, so indexing thousands of
+        existing files is a single fsync. Returns the number of files added.
+        """
+        known = self.indexed_paths()
+        added = 0
+        with closing(self._connect()) as conn, conn:
+            for path in sorted(Path(directory).glob('instagram_*.txt')):
+                if normalize_path(path) in known:
+                    continue
+                try:
+                    documents = parse_transcription_file(path)
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"Warning: Could not index {path}: {e}")
+                    continue
+                for url, text, video_index in documents:
+                    self._insert(conn, url, [{'text': text}], path, video_index)
+                added += 1
+        return added
+
+    def search(self, query, limit=20):
+        """Search transcripts; returns hits ordered by relevance.
+
+        Each hit is a dict with shortcode, url, path, video_index, start_ms,
+        end_ms and a highlighted snippet.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT d.shortcode, d.url, d.path, d.video_index, s.start_ms, s.end_ms, "
+                "snippet(segments_fts, 0, '[', ']', '...', 12) "
+                "FROM segments_fts "
+                "JOIN segments s ON s.id = segments_fts.rowid "
+                "JOIN documents d ON d.id = s.document_id "
+                "WHERE segments_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        keys = ('shortcode', 'url', 'path', 'video_index', 'start_ms', 'end_ms', 'snippet')
+        return [dict(zip(keys, row)) for row in rows]
+
+
+def parse_transcription_file(path):
+    """Read a saved transcription file back into (url, text, video_index) tuples.
+
+    Single-video files yield one tuple; batch files yield one per video,
+    without a URL since the batch format does not record one.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    if content.startswith("Instagram Batch Transcription"):
+        header, _, body = content.partition(BATCH_SEPARATOR)
+        selected = re.search(r'^Selected Videos: (.*)$', header, re.MULTILINE)
+        indices = [int(i) for i in re.findall(r'\d+', selected.group(1))] if selected else []
+        documents = []
+        paragraphs = [p.strip() for p in body.split('\n\n') if p.strip()]
+        for position, paragraph in enumerate(paragraphs):
+            video_index = indices[position] if position < len(indices) else None
+            if FAILED_PLACEHOLDER.match(paragraph):
+                continue
+            documents.append((None, paragraph, video_index))
+        return documents
+
+    header, _, body = content.partition(SINGLE_SEPARATOR)
+    url = re.search(r'^URL: (.*)$', header, re.MULTILINE)
+    text = body.strip()
+    return [(url.group(1).strip() if url else None, text, None)] if text else []
+
+
+def format_ms(ms):
+    """Format milliseconds as m:ss.mmm for search output."""
+    if ms is None:
+        return "--:--"
+    minutes, remainder = divmod(ms, 60000)
+    return f"{minutes}:{remainder // 1000:02d}.{remainder % 1000:03d}"
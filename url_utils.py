@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+URL Utilities
+Helpers for working with Instagram post and reel URLs.
+"""
+
+import re
+
+
+SHORTCODE_PATTERN = re.compile(r'/(?:reel|p)/([^/?#]+)')
+
+
+def extract_shortcode(url):
+    """Return the post/reel shortcode from an Instagram URL, or None."""
+    match = SHORTCODE_PATTERN.search(url or "")
+    return match.group(1) if match else None
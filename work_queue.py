@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Work Queue
+A shared SQLite work-queue used to spread a batch transcription across
+several worker processes or hosts.
+
+The coordinator enqueues the selected videos, workers lease items one at a
+time (keeping the lease alive with heartbeats while they transcribe), and a
+final merge step writes the same merged file as a local batch run.
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_index INTEGER NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, video_index);
+"""
+
+
+class WorkQueue:
+    """SQLite-backed queue of batch items with leases and re-queue on expiry.
+
+    Every operation opens its own short-lived connection, so a single queue
+    object can be shared between a worker loop and its heartbeat thread, and
+    any number of processes can point at the same file.
+    """
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = str(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit mode; writes use explicit BEGIN IMMEDIATE transactions
+        # so that two workers can never lease the same item.
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def enqueue(self, urls, selected_indices):
+        """Add the selected videos (1-based indices into urls) to the queue.
+
+        Items that are already queued are left untouched, so re-running the
+        coordinator on the same file is safe. Returns the number of new items.
+        """
+        now = time.time()
+        rows = [(index, urls[index - 1], now) for index in selected_indices]
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO items (video_index, url, updated) VALUES (?, ?, ?)",
+                    rows,
+                )
+                added = conn.total_changes - before
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def _expire_leases(self, conn, now):
+        """Re-queue items whose lease ran out, or fail them after too many attempts."""
+        conn.execute(
+            "UPDATE items SET status = 'failed', error = 'lease expired', "
+            "lease_owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE items SET status = 'pending', lease_owner = NULL, "
+            "lease_expires = NULL, updated = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def lease(self, worker_id):
+        """Lease the next pending item for worker_id.
+
+        Returns a dict with id, video_index, url and attempts, or None if
+        nothing is currently available.
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_leases(conn, now)
+                row = conn.execute(
+                    "SELECT id, video_index, url, attempts FROM items "
+                    "WHERE status = 'pending' ORDER BY video_index LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE items SET status = 'leased', lease_owner = ?, "
+                    "lease_expires = ?, attempts = attempts + 1, updated = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return {
+            'id': row[0],
+            'video_index': row[1],
+            'url': row[2],
+            'attempts': row[3] + 1,
+        }
+
+    def _update_leased(self, sql, params):
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(sql, params)
+            return cursor.rowcount == 1
+
+    def heartbeat(self, item_id, worker_id):
+        """Extend the lease on an item. Returns False if the lease was lost."""
+        now = time.time()
+        return self._update_leased(
+            "UPDATE items SET lease_expires = ?, updated = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + self.lease_seconds, now, item_id, worker_id),
+        )
+
+    def complete(self, item_id, worker_id, transcription):
+        """Store the transcription for a leased item and mark it done."""
+        return self._update_leased(
+            "UPDATE items SET status = 'done', result = ?, error = NULL, "
+            "lease_owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (transcription, time.time(), item_id, worker_id),
+        )
+
+    def fail(self, item_id, worker_id, error):
+        """Mark a leased item as failed with a short reason."""
+        return self._update_leased(
+            "UPDATE items SET status = 'failed', error = ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (error, time.time(), item_id, worker_id),
+        )
+
+    def counts(self):
+        """Return a dict of item counts by status."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def remaining(self):
+        """Number of items that are not finished yet (pending or leased)."""
+        counts = self.counts()
+        return counts['pending'] + counts['leased']
+
+    def results(self):
+        """Return (video_index, transcription, error, url) tuples ordered by video index."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT video_index, COALESCE(result, ''), error, url FROM items "
+                "ORDER BY video_index"
+            ).fetchall()
+
+
+class LeaseHeartbeat:
+    """Background thread that keeps an item's lease alive while it is processed."""
+
+    def __init__(self, queue, item_id, worker_id, interval=None):
+        self.queue = queue
+        self.item_id = item_id
+        self.worker_id = worker_id
+        self.interval = interval or max(queue.lease_seconds / 3.0, 0.05)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                alive = self.queue.heartbeat(self.item_id, self.worker_id)
+            except sqlite3.Error as e:
+                # Usually "database is locked" under many workers; the lease
+                # has lease_seconds of slack, so try again next interval
+                print(f"Warning: Heartbeat for item {self.item_id} failed: {e}")
+                continue
+            if not alive:
+                self.lost = True
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def default_worker_id():
+    """Build a worker id that is unique across hosts and processes."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def run_worker(queue, transcribe_fn, worker_id=None, poll_interval=2.0, failure_reason=None):
+    """Pull items from the queue until it is drained.
+
+    transcribe_fn takes a URL and returns the transcription text, or None on
+    failure (e.g. InstagramTranscriber.transcribe_video_direct). The optional
+    failure_reason callable maps a failed URL to the reason stored in the queue.
+    Returns the number of items this worker completed.
+    """
+    worker_id = worker_id or default_worker_id()
+    print(f"Worker {worker_id} started on queue: {queue.db_path}")
+    completed = 0
+
+    while True:
+        item = queue.lease(worker_id)
+        if item is None:
+            if queue.remaining() == 0:
+                break
+            # Other workers hold the remaining leases; wait in case one expires
+            time.sleep(poll_interval)
+            continue
+
+        print(f"\nWorker {worker_id} processing video {item['video_index']} "
+              f"(attempt {item['attempts']}): {item['url']}")
+        try:
+            with LeaseHeartbeat(queue, item['id'], worker_id) as heartbeat:
+                transcription = transcribe_fn(item['url'])
+        except Exception as e:
+            print(f"Error processing video {item['video_index']}: {e}")
+            queue.fail(item['id'], worker_id, str(e))
+            continue
+
+        if heartbeat.lost:
+            print(f"Lease on video {item['video_index']} was lost; discarding result")
+            continue
+
+        if transcription:
+            if queue.complete(item['id'], worker_id, transcription):
+                completed += 1
+                print(f"Video {item['video_index']} transcribed successfully")
+        else:
+            reason = failure_reason(item['url']) if failure_reason else 'transcription failed'
+            queue.fail(item['id'], worker_id, reason)
+            print(f"Failed to transcribe video {item['video_index']} ({reason})")
+
+    print(f"Worker {worker_id} finished: {completed} videos transcribed")
+    return completed
+
+
+def merge_results(queue, transcriber, force=False):
+    """Write the merged batch file from the queue results.
+
+    Returns the output path, or None if items are still outstanding and
+    force is not set.
+    """
+    remaining = queue.remaining()
+    if remaining and not force:
+        print(f"Cannot merge yet: {remaining} videos are still pending or leased")
+        return None
+
+    rows = queue.results()
+    if not rows:
+        print("Queue is empty, nothing to merge")
+        return None
+
+    selected_indices = [row[0] for row in rows]
+    transcriptions = [row[1] for row in rows]
+    urls = [row[3] for row in rows]
+    failures = [row[2] for row in rows]
+    return transcriber.save_batch_transcription(transcriptions, selected_indices, urls,
+                                                failures=failures)